@@ -0,0 +1,136 @@
+"""Operational commands, run once per deploy or from cron rather than in
+every server worker.
+
+    python -m app.cli migrate
+    python -m app.cli audit-indexes
+    python -m app.cli ensure-partitions
+    python -m app.cli prune-tokens
+    python -m app.cli prune-outbox
+    python -m app.cli calibrate-hash
+    python -m app.cli build-password-filter
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import and_, delete, or_
+
+from app.core.config import settings
+from app.core import database
+from app.core.index_audit import audit_indexes as find_index_issues
+from app.core.logger import setup_logging
+from app.core.password_hasher import calibrate, hash_schemes
+from app.core.password_policy import build_breached_filter
+from app.core.usage_partitions import ensure_usage_partitions
+from app.models.email_outbox import EmailOutbox
+from app.models.refresh_token import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+def upgrade_schema(connection) -> None:
+    """Upgrade to the latest revision. Databases from before migrations
+    run the baseline too, which only adds the tables and columns they lack."""
+    config = Config(ALEMBIC_INI)
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
+async def migrate() -> None:
+    """Apply pending schema migrations, then make sure future usage
+    partitions exist"""
+    async with database.engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+    logger.info("Database schema is up to date")
+    await ensure_partitions()
+
+async def audit_indexes() -> None:
+    """Print redundant indexes and, on MySQL, indexes never read since the
+    server started"""
+    findings = await find_index_issues(database.engine)
+    for kind, index, detail in findings:
+        print(f"{kind:<10} {index}: {detail}")
+
+async def ensure_partitions() -> None:
+    added = await ensure_usage_partitions(database.engine, settings.USAGE_PARTITION_MONTHS_AHEAD)
+    logger.info(f"Usage partitions up to date ({added} added)")
+
+async def prune_tokens() -> None:
+    """Delete expired refresh tokens. Used ones are kept until then so a
+    replayed token is still recognised and revokes the user's sessions."""
+    async with database.session_scope() as db:
+        result = await db.execute(
+            delete(RefreshToken).where(RefreshToken.expires_at < datetime.utcnow())
+        )
+        await db.commit()
+    logger.info(f"Pruned {result.rowcount} refresh tokens")
+
+async def prune_outbox() -> None:
+    """Delete outbox emails sent or given up on more than
+    EMAIL_OUTBOX_RETENTION_DAYS ago"""
+    cutoff = datetime.utcnow() - timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+    async with database.session_scope() as db:
+        result = await db.execute(
+            delete(EmailOutbox).where(
+                or_(
+                    and_(EmailOutbox.status == "sent", EmailOutbox.sent_at < cutoff),
+                    # next_attempt_at holds the last attempt's lease for failed rows
+                    and_(EmailOutbox.status == "failed", EmailOutbox.next_attempt_at < cutoff)
+                )
+            )
+        )
+        await db.commit()
+    logger.info(f"Pruned {result.rowcount} outbox emails")
+
+async def calibrate_hash() -> None:
+    """Print the highest cost per configured scheme whose verify fits in
+    PASSWORD_HASH_TARGET_MS on this machine"""
+    target = settings.PASSWORD_HASH_TARGET_MS / 1000
+    for scheme in hash_schemes():
+        name, cost, elapsed = await asyncio.to_thread(calibrate, scheme, target)
+        print(f"{name}={cost}  # {elapsed * 1000:.0f} ms per {scheme} verify")
+        if elapsed > target:
+            logger.warning(f"Cheapest {scheme} cost is over the target; for argon2 lower PASSWORD_ARGON2_MEMORY_KB")
+
+async def build_password_filter() -> None:
+    """Build the breached password filter from PASSWORD_BREACHED_LIST.
+    Workers map the new file on their next start."""
+    if not settings.PASSWORD_BREACHED_LIST or not settings.PASSWORD_BREACHED_FILTER_PATH:
+        raise SystemExit("Set PASSWORD_BREACHED_LIST and PASSWORD_BREACHED_FILTER_PATH first")
+    count = await asyncio.to_thread(
+        build_breached_filter,
+        settings.PASSWORD_BREACHED_LIST,
+        settings.PASSWORD_BREACHED_FILTER_PATH,
+        settings.PASSWORD_BREACHED_FALSE_POSITIVE_RATE
+    )
+    logger.info(f"Breached password filter written to {settings.PASSWORD_BREACHED_FILTER_PATH} ({count} passwords)")
+
+COMMANDS = {
+    "migrate": migrate,
+    "audit-indexes": audit_indexes,
+    "ensure-partitions": ensure_partitions,
+    "prune-tokens": prune_tokens,
+    "prune-outbox": prune_outbox,
+    "calibrate-hash": calibrate_hash,
+    "build-password-filter": build_password_filter,
+}
+
+async def run(command: str) -> None:
+    try:
+        await COMMANDS[command]()
+    finally:
+        await database.dispose_engine()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    setup_logging()
+    asyncio.run(run(args.command))
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,19 +11,144 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secure-secret-key")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+
+    # Server process (python -m app.server)
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "0"))  # 0 sizes to the available CPUs
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT_SECONDS", "30"))  # drain time for in-flight requests
+    SERVER_KEEPALIVE_SECONDS: int = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "5"))
+
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "DEBUG" if os.getenv("ENVIRONMENT", "development") == "development" else "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+    LOG_ASYNC: bool = os.getenv("LOG_ASYNC", "true").lower() == "true"  # write logs from a background thread
+    LOG_ROTATION: str = os.getenv("LOG_ROTATION", "size")  # "size", "time" or "none"
+    LOG_ROTATION_WHEN: str = os.getenv("LOG_ROTATION_WHEN", "midnight")
+    LOG_MAX_BYTES: int = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+    LOG_REQUEST_SAMPLE_RATE: float = float(os.getenv("LOG_REQUEST_SAMPLE_RATE", "0.1"))  # fraction of requests logged
+    LOG_SQL: bool = os.getenv("LOG_SQL", "false").lower() == "true"  # log every SQL statement
+    METRICS_PUBLISH_SECONDS: float = float(os.getenv("METRICS_PUBLISH_SECONDS", "5"))  # with several workers, how often each shares its stats
+
+    # Database connection pool and checkout retries
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    DB_POOL_WARM: int = int(os.getenv("DB_POOL_WARM", os.getenv("DB_POOL_SIZE", "5")))  # connections opened at startup
+    DB_CONNECT_RETRIES: int = int(os.getenv("DB_CONNECT_RETRIES", "3"))
+    DB_RETRY_BASE_SECONDS: float = float(os.getenv("DB_RETRY_BASE_SECONDS", "0.2"))
+    DB_RETRY_MAX_SECONDS: float = float(os.getenv("DB_RETRY_MAX_SECONDS", "2"))
+    DB_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("DB_BREAKER_FAILURE_THRESHOLD", "5"))
+    DB_BREAKER_RESET_SECONDS: float = float(os.getenv("DB_BREAKER_RESET_SECONDS", "10"))
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # MySQL SELECTs, 0 keeps the server default
+    DB_LOCK_WAIT_TIMEOUT_SECONDS: int = int(os.getenv("DB_LOCK_WAIT_TIMEOUT_SECONDS", "0"))  # InnoDB row locks, 0 keeps the server default
+
+    # Read replicas for read-only endpoints (comma-separated, empty reads from the primary)
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))  # lagging replicas are skipped
+    DB_REPLICA_CHECK_SECONDS: float = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "10"))  # lag is re-measured this often
     
     # Email settings
-    SMTP_TLS: bool = True  # Always use TLS for Gmail
-    SMTP_PORT: int = 587  # Standard port for Gmail SMTP with STARTTLS
-    SMTP_HOST: str = "smtp.gmail.com"
+    SMTP_TLS: bool = os.getenv("SMTP_TLS", "true").lower() == "true"  # STARTTLS, required by Gmail
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))  # Standard port for Gmail SMTP with STARTTLS
+    SMTP_HOST: str = os.getenv("SMTP_HOST", "smtp.gmail.com")
     SMTP_USER: str = os.getenv("SMTP_USER", "")
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")  # Use App Password for Gmail
     EMAILS_FROM_EMAIL: str = os.getenv("EMAILS_FROM_EMAIL", "")
     EMAILS_FROM_NAME: str = os.getenv("EMAILS_FROM_NAME", "MSAT Manager")
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "2"))
+    SMTP_POOL_IDLE_SECONDS: int = int(os.getenv("SMTP_POOL_IDLE_SECONDS", "60"))
+    # Unset: a private per-user directory Jinja creates and checks; empty disables
+    EMAIL_TEMPLATE_CACHE_DIR: Optional[str] = os.getenv("EMAIL_TEMPLATE_CACHE_DIR")
+
+    # Email outbox worker
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+    EMAIL_OUTBOX_POLL_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "5"))
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_RETRY_BASE_SECONDS", "10"))
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_RETRY_MAX_SECONDS", "900"))
+    # Sends running longer than this may be retried by another worker
+    EMAIL_OUTBOX_CLAIM_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_CLAIM_SECONDS", "300"))
+    EMAIL_OUTBOX_RETENTION_DAYS: int = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", "7"))
     
     # Password reset token expiration (in minutes)
     PASSWORD_RESET_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("PASSWORD_RESET_TOKEN_EXPIRE_MINUTES", "30"))
+
+    # Password hashing worker pool ("thread" or "process")
+    PASSWORD_HASH_EXECUTOR: str = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE_SIZE: int = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+
+    # Password policy for new passwords
+    PASSWORD_MIN_LENGTH: int = int(os.getenv("PASSWORD_MIN_LENGTH", "8"))
+    PASSWORD_REQUIRE_UPPER: bool = os.getenv("PASSWORD_REQUIRE_UPPER", "true").lower() == "true"
+    PASSWORD_REQUIRE_LOWER: bool = os.getenv("PASSWORD_REQUIRE_LOWER", "true").lower() == "true"
+    PASSWORD_REQUIRE_DIGIT: bool = os.getenv("PASSWORD_REQUIRE_DIGIT", "true").lower() == "true"
+    PASSWORD_REQUIRE_SYMBOL: bool = os.getenv("PASSWORD_REQUIRE_SYMBOL", "false").lower() == "true"
+    PASSWORD_BREACHED_LIST: str = os.getenv("PASSWORD_BREACHED_LIST", "")  # one password per line, .gz allowed; read by build-password-filter
+    PASSWORD_BREACHED_FILTER_PATH: str = os.getenv("PASSWORD_BREACHED_FILTER_PATH", "")  # empty disables the breached check
+    PASSWORD_BREACHED_FALSE_POSITIVE_RATE: float = float(os.getenv("PASSWORD_BREACHED_FALSE_POSITIVE_RATE", "0.001"))
+
+    # Password hashing cost; hashes stored with other parameters are upgraded at login
+    PASSWORD_HASH_SCHEMES: str = os.getenv("PASSWORD_HASH_SCHEMES", "bcrypt")  # comma-separated, the first hashes new passwords
+    PASSWORD_BCRYPT_ROUNDS: int = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))  # log2 of the iterations
+    PASSWORD_ARGON2_TIME_COST: int = int(os.getenv("PASSWORD_ARGON2_TIME_COST", "3"))
+    PASSWORD_ARGON2_MEMORY_KB: int = int(os.getenv("PASSWORD_ARGON2_MEMORY_KB", "65536"))  # per hash in flight
+    PASSWORD_ARGON2_PARALLELISM: int = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "2"))
+    PASSWORD_HASH_TARGET_MS: float = float(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))  # verify time aimed for by calibrate-hash
+
+    # Authenticated user cache ("memory" per worker, or "sqlite" shared by workers on one host)
+    USER_CACHE_BACKEND: str = os.getenv("USER_CACHE_BACKEND", "memory")
+    USER_CACHE_PATH: str = os.getenv("USER_CACHE_PATH", "cache/user_cache.sqlite3")
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    USER_CACHE_MAX_ENTRIES: int = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+    # Rate limits for the auth endpoints, as "<requests>/<seconds>"
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" per worker, or "sqlite" shared by workers on one host
+    RATE_LIMIT_PATH: str = os.getenv("RATE_LIMIT_PATH", "cache/rate_limit.sqlite3")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() == "true"  # only behind a proxy that sets it
+    RATE_LIMIT_LOGIN_PER_IP: str = os.getenv("RATE_LIMIT_LOGIN_PER_IP", "30/60")
+    RATE_LIMIT_LOGIN_PER_USERNAME: str = os.getenv("RATE_LIMIT_LOGIN_PER_USERNAME", "10/300")
+    RATE_LIMIT_REGISTER_PER_IP: str = os.getenv("RATE_LIMIT_REGISTER_PER_IP", "10/3600")
+    RATE_LIMIT_RESET_PER_IP: str = os.getenv("RATE_LIMIT_RESET_PER_IP", "10/3600")
+    RATE_LIMIT_RESET_PER_EMAIL: str = os.getenv("RATE_LIMIT_RESET_PER_EMAIL", "3/3600")
+
+    # Verified access-token cache (0 disables it)
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+    # Admin endpoints
+    ADMIN_USERNAMES: str = os.getenv("ADMIN_USERNAMES", "")  # comma-separated; empty disables /admin
+    USER_IMPORT_MAX_ROWS: int = int(os.getenv("USER_IMPORT_MAX_ROWS", "10000"))
+    USER_IMPORT_CHUNK_SIZE: int = int(os.getenv("USER_IMPORT_CHUNK_SIZE", "1000"))  # rows per INSERT statement
+    USER_IMPORT_HASH_CONCURRENCY: int = int(os.getenv("USER_IMPORT_HASH_CONCURRENCY", str(max(1, (os.cpu_count() or 1) // 2))))  # hasher workers one import may use
+
+    # Devices
+    DEVICE_UPSERT_CHUNK_SIZE: int = int(os.getenv("DEVICE_UPSERT_CHUNK_SIZE", "1000"))  # rows per INSERT statement
+
+    # Device presence (heartbeats)
+    DEVICE_PRESENCE_MAX_DEVICES: int = int(os.getenv("DEVICE_PRESENCE_MAX_DEVICES", "100000"))  # per worker; beyond this new devices get 429
+    DEVICE_PRESENCE_FLUSH_SECONDS: float = float(os.getenv("DEVICE_PRESENCE_FLUSH_SECONDS", "5"))  # also the most last_seen a crash can lose
+    DEVICE_PRESENCE_FLUSH_SIZE: int = int(os.getenv("DEVICE_PRESENCE_FLUSH_SIZE", "500"))  # devices per UPDATE statement
+    DEVICE_OFFLINE_AFTER_SECONDS: float = float(os.getenv("DEVICE_OFFLINE_AFTER_SECONDS", "90"))  # online while a heartbeat is newer than this
+
+    # Usage ingestion buffer
+    USAGE_BUFFER_MAX_RECORDS: int = int(os.getenv("USAGE_BUFFER_MAX_RECORDS", "200000"))  # beyond this clients get 429
+    USAGE_FLUSH_SIZE: int = int(os.getenv("USAGE_FLUSH_SIZE", "5000"))  # rows per INSERT, and flush trigger
+    USAGE_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("USAGE_FLUSH_INTERVAL_SECONDS", "1"))
+
+    # Usage storage and queries
+    USAGE_PARTITION_MONTHS_AHEAD: int = int(os.getenv("USAGE_PARTITION_MONTHS_AHEAD", "3"))  # MySQL monthly partitions kept ready
+    USAGE_QUERY_MAX_BUCKETS: int = int(os.getenv("USAGE_QUERY_MAX_BUCKETS", "10000"))  # cap on points per series response
+
+    # Streaming exports
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))  # rows fetched from the cursor at a time
+    EXPORT_GZIP_LEVEL: int = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
     
     class Config:
         env_file = ".env"
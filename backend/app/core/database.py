@@ -1,48 +1,429 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql import Select
 from app.core.config import settings
-import os
+from contextlib import asynccontextmanager
+import asyncio
+import random
 import time
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import OperationalError, InterfaceError, TimeoutError as PoolTimeoutError
+from typing import List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Only enable SQL echoing in development
-echo = os.getenv("ENVIRONMENT", "production").lower() == "development"
+# Echo every statement only when explicitly asked for; it is a large per-query cost
+echo = settings.LOG_SQL
 
-def get_engine():
-    return create_async_engine(
-        settings.DATABASE_URL,
+def get_engine(url: str = settings.DATABASE_URL):
+    options = dict(
         echo=echo,
         pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10,
-        pool_recycle=3600
+        pool_recycle=settings.DB_POOL_RECYCLE
     )
+    # SQLite (used for local benchmarks) has no connection pool to size
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT
+        )
+        # Applied by the driver to every new connection, before it is pooled
+        timeouts = []
+        if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+            # MySQL only enforces this for SELECTs, the statements replicas serve
+            timeouts.append(f"MAX_EXECUTION_TIME = {int(settings.DB_STATEMENT_TIMEOUT_MS)}")
+        if settings.DB_LOCK_WAIT_TIMEOUT_SECONDS > 0:
+            timeouts.append(f"innodb_lock_wait_timeout = {int(settings.DB_LOCK_WAIT_TIMEOUT_SECONDS)}")
+        if timeouts:
+            options["connect_args"] = {"init_command": "SET SESSION " + ", ".join(timeouts)}
+    return create_async_engine(url, **options)
 
-engine = get_engine()
-async_session = sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+# "mysql" or "sqlite", known without loading the driver
+dialect_name = make_url(settings.DATABASE_URL).get_backend_name()
 
-async def get_db():
-    max_retries = 5
-    retry_delay = 5  # seconds
-    
-    for attempt in range(max_retries):
+class RoutingSession(Session):
+    """Sends SELECTs of a read-only session to the replica it was opened on,
+    and everything else to the primary.
+
+    Once the session writes, it stays on the primary for the rest of its life
+    so it always reads its own writes. Sessions opened without a replica
+    behave like a plain ``Session``.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is not None and not self.info.get("wrote"):
+            if (
+                not self._flushing
+                and isinstance(clause, Select)
+                and clause._for_update_arg is None
+            ):
+                return replica.engine.sync_engine
+            if self._flushing or clause is not None:
+                self.info["wrote"] = True
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+_engine: Optional[AsyncEngine] = None
+_async_session: Optional[sessionmaker] = None
+
+def _session_factory() -> sessionmaker:
+    global _engine, _async_session
+    if _async_session is None:
+        _engine = get_engine()
+        _async_session = sessionmaker(
+            _engine,
+            class_=AsyncSession,
+            sync_session_class=RoutingSession,
+            expire_on_commit=False
+        )
+    return _async_session
+
+def _current_engine() -> AsyncEngine:
+    _session_factory()
+    return _engine
+
+def __getattr__(name: str):
+    # ``engine`` and ``async_session`` are built on first access, so importing
+    # models and routers (or a CLI command) does not load the database driver
+    if name == "engine":
+        return _current_engine()
+    if name == "async_session":
+        return _session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def dispose_engine() -> None:
+    """Close every pooled connection, if the engine was ever created"""
+    if _engine is not None:
+        await _engine.dispose()
+    await replicas.dispose()
+
+class DatabaseUnavailable(Exception):
+    """Raised when no connection could be checked out, or the breaker is open"""
+
+class CircuitBreaker:
+    """Fails fast after repeated connection failures instead of queueing on a dead database.
+
+    Opens after ``failure_threshold`` consecutive failures. While open every
+    call is rejected; after ``reset_timeout`` seconds one trial call is let
+    through (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Let another call make the half-open trial, when this one ended
+        without an outcome (e.g. it was cancelled)"""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.error(f"Database circuit breaker opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+class PoolMetrics:
+    """Connection checkout counters and wait times"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def observe_checkout(self, wait: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += wait
+        if wait > self.wait_seconds_max:
+            self.wait_seconds_max = wait
+
+def pool_stats() -> dict:
+    """Live pool occupancy plus checkout metrics"""
+    pool = _current_engine().pool
+    stats = {
+        "checkouts": pool_metrics.checkouts,
+        "checkout_failures": pool_metrics.checkout_failures,
+        "rejected": pool_metrics.rejected,
+        "wait_seconds_total": pool_metrics.wait_seconds_total,
+        "wait_seconds_max": pool_metrics.wait_seconds_max,
+        "breaker_state": db_breaker.state,
+    }
+    # NullPool (SQLite) does not track occupancy
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
+
+class Replica:
+    """One read replica: its engine, built on first use, and its last
+    measured replication lag"""
+
+    def __init__(self, url: str):
+        self.url = url
+        parsed = make_url(url)
+        self.name = parsed.host or parsed.database
+        self.dialect = parsed.get_backend_name()
+        self.lag: Optional[float] = None
+        self.healthy = True
+        self.checked_at = float("-inf")
+        self.reads = 0
+        self._engine: Optional[AsyncEngine] = None
+        self._checking = False
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._engine = get_engine(self.url)
+        return self._engine
+
+    async def check(self) -> None:
+        """Measure replication lag. Replicas that cannot be reached, have
+        replication stopped, or lag more than DB_REPLICA_MAX_LAG_SECONDS are
+        skipped until the next check."""
+        if self._checking:
+            return
+        self._checking = True
         try:
-            async with async_session() as session:
-                try:
-                    yield session
-                finally:
-                    await session.close()
-            break
-        except OperationalError as e:
-            if attempt == max_retries - 1:
-                logger.error(f"Failed to connect to database after {max_retries} attempts: {str(e)}")
-                raise
-            logger.warning(f"Database connection attempt {attempt + 1} failed, retrying in {retry_delay} seconds...")
-            time.sleep(retry_delay) 
\ No newline at end of file
+            # Local SQLite "replicas" are plain copies with nothing to lag behind
+            lag = 0.0
+            if self.dialect == "mysql":
+                async with self.engine.connect() as conn:
+                    status = (await conn.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+                # Not replicating (e.g. a second local container) counts as current
+                if status is not None:
+                    lag = status["Seconds_Behind_Source"]
+            self.lag = float(lag) if lag is not None else None
+        except Exception as e:
+            # Includes a missing REPLICATION CLIENT privilege
+            self.lag = None
+            logger.warning(f"Replica {self.name} lag check failed: {str(e)}")
+        finally:
+            self._checking = False
+            self.checked_at = time.monotonic()
+
+        healthy = self.lag is not None and self.lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+        if healthy != self.healthy:
+            lag = "unknown" if self.lag is None else f"{self.lag:.0f}s"
+            if healthy:
+                logger.info(f"Replica {self.name} back in rotation (lag {lag})")
+            else:
+                logger.warning(f"Replica {self.name} taken out of rotation (lag {lag})")
+        self.healthy = healthy
+
+    def mark_down(self) -> None:
+        """Skip this replica until the next lag check"""
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+class ReplicaSet:
+    """Round-robin choice among the healthy replicas in DATABASE_REPLICA_URLS"""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self.primary_fallbacks = 0
+        self._next = 0
+        self._checks = set()
+
+    async def choose(self) -> Optional[Replica]:
+        """A replica to read from, or None to read from the primary"""
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next]
+            self._next = (self._next + 1) % len(self.replicas)
+            if replica.checked_at == float("-inf"):
+                await replica.check()
+            elif now - replica.checked_at >= settings.DB_REPLICA_CHECK_SECONDS and not replica._checking:
+                # Later checks run in the background on the last known state
+                task = asyncio.create_task(replica.check())
+                self._checks.add(task)
+                task.add_done_callback(self._checks.discard)
+            if replica.healthy:
+                return replica
+        if self.replicas:
+            self.primary_fallbacks += 1
+        return None
+
+    async def dispose(self) -> None:
+        for task in list(self._checks):
+            task.cancel()
+        for replica in self.replicas:
+            if replica._engine is not None:
+                await replica._engine.dispose()
+
+    def stats(self) -> list:
+        return [
+            {"name": replica.name, "lag": replica.lag, "healthy": replica.healthy, "reads": replica.reads}
+            for replica in self.replicas
+        ]
+
+db_breaker = CircuitBreaker(settings.DB_BREAKER_FAILURE_THRESHOLD, settings.DB_BREAKER_RESET_SECONDS)
+pool_metrics = PoolMetrics()
+replicas = ReplicaSet([url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()])
+
+async def _acquire_replica_session() -> Optional[AsyncSession]:
+    """Session whose reads go to a healthy replica, or None when there is none.
+
+    A replica whose connection fails is skipped until its next lag check;
+    the caller falls back to the primary.
+    """
+    replica = await replicas.choose()
+    if replica is None:
+        return None
+    session = _session_factory()()
+    session.info["replica"] = replica
+    try:
+        await session.connection(bind_arguments={"bind": replica.engine.sync_engine})
+    except (OperationalError, InterfaceError, PoolTimeoutError, OSError) as e:
+        await session.close()
+        replica.mark_down()
+        replicas.primary_fallbacks += 1
+        logger.warning(f"Replica {replica.name} unavailable, reading from the primary: {str(e)}")
+        return None
+    except BaseException:
+        await session.close()
+        raise
+    replica.reads += 1
+    return session
+
+async def acquire_session(read_only: bool = False) -> AsyncSession:
+    """Open a session with a connection already checked out of the pool.
+
+    With ``read_only`` its SELECTs go to a read replica when one is
+    configured and healthy (see ``RoutingSession``), otherwise to the primary.
+    Only the checkout is retried (with jittered exponential backoff);
+    errors raised once the caller is using the session propagate as-is.
+    """
+    if read_only and replicas.replicas:
+        session = await _acquire_replica_session()
+        if session is not None:
+            return session
+
+    for attempt in range(1, settings.DB_CONNECT_RETRIES + 1):
+        if not db_breaker.allow():
+            pool_metrics.rejected += 1
+            raise DatabaseUnavailable("Database circuit breaker is open")
+
+        session = _session_factory()()
+        start = time.perf_counter()
+        try:
+            await session.connection()
+        except (OperationalError, InterfaceError, PoolTimeoutError, OSError) as e:
+            await session.close()
+            pool_metrics.checkout_failures += 1
+            db_breaker.record_failure()
+            if attempt == settings.DB_CONNECT_RETRIES:
+                logger.error(f"Failed to connect to database after {attempt} attempts: {str(e)}")
+                raise DatabaseUnavailable(str(e)) from e
+            delay = random.uniform(0, min(settings.DB_RETRY_MAX_SECONDS, settings.DB_RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+            logger.warning(f"Database connection attempt {attempt} failed, retrying in {delay:.2f} seconds...")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException as e:
+            # Anything else, cancellation included, must not leak the session
+            # or leave a half-open trial claimed forever
+            await session.close()
+            if isinstance(e, Exception):
+                db_breaker.record_failure()
+            else:
+                db_breaker.release_trial()
+            raise
+
+        pool_metrics.observe_checkout(time.perf_counter() - start)
+        db_breaker.record_success()
+        return session
+
+@asynccontextmanager
+async def session_scope(read_only: bool = False):
+    session = await acquire_session(read_only)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+async def get_db():
+    async with session_scope() as session:
+        yield session
+
+async def get_read_db():
+    """Like ``get_db``, for endpoints that only read and can tolerate
+    DB_REPLICA_MAX_LAG_SECONDS of replication lag"""
+    async with session_scope(read_only=True) as session:
+        yield session
+
+async def warm_pool(connections: int) -> int:
+    """Open ``connections`` pooled connections up front so the first requests
+    skip the connect handshake; returns how many could be opened"""
+    engine = _current_engine()
+    results = await asyncio.gather(*(engine.connect() for _ in range(connections)), return_exceptions=True)
+    opened = [conn for conn in results if not isinstance(conn, Exception)]
+    for conn in opened:
+        await conn.close()
+    if len(opened) < connections:
+        errors = [result for result in results if isinstance(result, Exception)]
+        logger.warning(f"Opened {len(opened)} of {connections} pool connections: {str(errors[0])}")
+    return len(opened)
+
+def upsert(table, conflict_columns: list, update_columns: list, also_set: dict = None):
+    """Build an INSERT that updates ``update_columns`` when the row already exists.
+
+    Renders ``INSERT ... ON DUPLICATE KEY UPDATE`` on MySQL and
+    ``INSERT ... ON CONFLICT DO UPDATE`` on SQLite. ``conflict_columns``
+    must match a unique key; MySQL infers it, SQLite needs it spelled out.
+    ``also_set`` adds expressions such as ``updated_at=func.now()``, since
+    column ``onupdate`` defaults do not fire for the conflict branch. It may
+    also be a callable that receives the incoming row's columns
+    (``inserted``/``excluded``) and returns that dict, for updates that
+    combine old and new values.
+
+    Execute it with a list of row dicts: the statement is compiled once and
+    cached, and the MySQL driver folds the executemany into multi-row
+    ``INSERT ... VALUES (...), (...)`` statements. Building the rows into
+    the statement with ``.values(rows)`` instead would recompile thousands
+    of bind parameters per call.
+    """
+    if dialect_name == "sqlite":
+        stmt = sqlite.insert(table)
+        new = stmt.excluded
+    else:
+        stmt = mysql.insert(table)
+        new = stmt.inserted
+    if callable(also_set):
+        also_set = also_set(new)
+    values = {**{column: new[column] for column in update_columns}, **(also_set or {})}
+
+    if dialect_name == "sqlite":
+        return stmt.on_conflict_do_update(index_elements=conflict_columns, set_=values)
+    return stmt.on_duplicate_key_update(values)
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.config import settings
+from app.core.database import session_scope
+from app.core.email_service import send_email
+from app.models.email_outbox import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+def enqueue_email(
+    db: AsyncSession,
+    email_to: str,
+    subject: str,
+    template_name: str,
+    template_data: dict
+) -> EmailOutbox:
+    """Add an email to the outbox; it is delivered once the caller commits"""
+    entry = EmailOutbox(
+        email_to=email_to,
+        subject=subject,
+        template_name=template_name,
+        template_data=template_data,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(entry)
+    return entry
+
+class OutboxWorker:
+    """Background task that delivers pending outbox emails in batches.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so several
+    app workers can poll the same table without sending an email twice.
+    The claim pushes ``next_attempt_at`` ``claim_timeout`` seconds ahead and
+    commits before any SMTP work, so no row lock is held during sends; if
+    the worker dies mid-send the rows become due again after the lease.
+    Failed sends are retried with exponential backoff until
+    ``max_attempts`` is reached, after which the row is marked failed.
+    Finished rows drop their ``template_data``, which may hold reset links.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        retry_base: float,
+        retry_max: float,
+        claim_timeout: float
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.claim_timeout = claim_timeout
+        self.sent = 0
+        self.failed = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info("Email outbox worker started")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Email outbox worker stopped")
+
+    def wake(self) -> None:
+        """Deliver newly committed emails now instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.process_batch()
+            except Exception as e:
+                logger.error(f"Email outbox batch failed: {str(e)}")
+                processed = 0
+
+            # A full batch means more rows are probably waiting
+            if processed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _retry_delay(self, attempts: int) -> timedelta:
+        delay = min(self.retry_base * (2 ** (attempts - 1)), self.retry_max)
+        return timedelta(seconds=delay)
+
+    async def _claim(self) -> List[Row]:
+        """Lease a batch of due rows and commit, so sending holds no locks"""
+        async with session_scope() as db:
+            result = await db.execute(
+                select(
+                    EmailOutbox.id,
+                    EmailOutbox.email_to,
+                    EmailOutbox.subject,
+                    EmailOutbox.template_name,
+                    EmailOutbox.template_data,
+                    EmailOutbox.attempts
+                )
+                .where(
+                    EmailOutbox.status == "pending",
+                    EmailOutbox.next_attempt_at <= datetime.utcnow()
+                )
+                .order_by(EmailOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            entries = result.all()
+            if entries:
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_([entry.id for entry in entries]))
+                    .values(next_attempt_at=datetime.utcnow() + timedelta(seconds=self.claim_timeout))
+                )
+                await db.commit()
+        return entries
+
+    async def _deliver(self, entry: Row) -> dict:
+        """Send one claimed email; returns the column values to store"""
+        attempts = entry.attempts + 1
+        try:
+            await send_email(
+                email_to=entry.email_to,
+                subject=entry.subject,
+                template_name=entry.template_name,
+                template_data=entry.template_data
+            )
+        except Exception as e:
+            error = str(e)[:500]
+            if attempts >= self.max_attempts:
+                self.failed += 1
+                logger.error(f"Giving up on outbox email {entry.id} after {attempts} attempts")
+                return {"attempts": attempts, "last_error": error, "status": "failed", "template_data": {}}
+            logger.warning(f"Outbox email {entry.id} failed, retry {attempts} scheduled")
+            return {
+                "attempts": attempts,
+                "last_error": error,
+                "next_attempt_at": datetime.utcnow() + self._retry_delay(attempts)
+            }
+
+        self.sent += 1
+        return {"attempts": attempts, "status": "sent", "sent_at": datetime.utcnow(), "template_data": {}}
+
+    async def process_batch(self) -> int:
+        """Send one batch of due emails; returns how many rows were processed"""
+        entries = await self._claim()
+        if not entries:
+            return 0
+
+        # The SMTP pool bounds how many of these run at once
+        results = await asyncio.gather(*(self._deliver(entry) for entry in entries))
+        async with session_scope() as db:
+            for entry, values in zip(entries, results):
+                await db.execute(update(EmailOutbox).where(EmailOutbox.id == entry.id).values(**values))
+            await db.commit()
+        return len(entries)
+
+outbox_worker = OutboxWorker(
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_interval=settings.EMAIL_OUTBOX_POLL_SECONDS,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    retry_base=settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS,
+    retry_max=settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS,
+    claim_timeout=settings.EMAIL_OUTBOX_CLAIM_SECONDS
+)
@@ -1,50 +1,202 @@
-import aiosmtplib
-from email.mime.text import MIMEText
+import asyncio
+import logging
+import ssl
+import time
+from contextlib import asynccontextmanager
+from email.charset import Charset
+from email.message import Message
 from email.mime.multipart import MIMEMultipart
-from jinja2 import Environment, PackageLoader, select_autoescape
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 from app.core.config import settings
-import ssl
+from app.core.metrics import EMAIL_SEND_LATENCY
 
-env = Environment(
-    loader=PackageLoader('app', 'templates'),
-    autoescape=select_autoescape(['html', 'xml'])
-)
+# jinja2 and aiosmtplib are imported on first use, so processes that never
+# render or send mail (CLI commands, most API requests) do not load them
+if TYPE_CHECKING:
+    import aiosmtplib
+    from jinja2 import Environment, Template
 
-async def send_email(
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def get_environment() -> "Environment":
+    from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader, select_autoescape
+
+    # The cache files are loaded with marshal, so the directory must not be
+    # writable by anyone else. Jinja's default is a per-user directory under
+    # the temp dir that it creates with mode 0700 and refuses if it is not.
+    bytecode_cache = None
+    if settings.EMAIL_TEMPLATE_CACHE_DIR is None:
+        bytecode_cache = FileSystemBytecodeCache()
+    elif settings.EMAIL_TEMPLATE_CACHE_DIR:
+        os.makedirs(settings.EMAIL_TEMPLATE_CACHE_DIR, mode=0o700, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(settings.EMAIL_TEMPLATE_CACHE_DIR)
+    return Environment(
+        loader=PackageLoader('app', 'templates'),
+        autoescape=select_autoescape(['html', 'xml']),
+        bytecode_cache=bytecode_cache,
+        # Without this Jinja stats the template file on every get_template call
+        auto_reload=settings.ENVIRONMENT == "development"
+    )
+
+_templates: Dict[str, "Template"] = {}
+
+def warm_templates() -> int:
+    """Compile every email template up front; returns how many were loaded"""
+    env = get_environment()
+    for name in env.list_templates(extensions=["html"]):
+        _templates[name] = env.get_template(name)
+    logger.info(f"Compiled {len(_templates)} email templates")
+    return len(_templates)
+
+def get_template(template_name: str) -> "Template":
+    name = f"{template_name}.html"
+    template = _templates.get(name)
+    if template is None:
+        template = _templates[name] = get_environment().get_template(name)
+    return template
+
+def render_template(template_name: str, template_data: dict) -> str:
+    """Render a compiled template. Output is not cached: it carries
+    per-message data such as reset tokens, which must not linger in memory.
+    The static parts need no cache of their own, since the compiled template
+    already emits them as string constants."""
+    return get_template(template_name).render(**template_data)
+
+_utf8 = Charset("utf-8")
+
+def _html_part(html_content: str) -> Message:
+    # Equivalent to MIMEText(html_content, "html") with the header values
+    # precomputed; MIMEText re-parses its Content-Type params on every call
+    part = Message()
+    part["Content-Type"] = 'text/html; charset="utf-8"'
+    part["MIME-Version"] = "1.0"
+    part["Content-Transfer-Encoding"] = "base64"
+    part.set_payload(_utf8.body_encode(html_content))
+    return part
+
+@lru_cache(maxsize=1)
+def _from_header() -> str:
+    return f"{settings.EMAILS_FROM_NAME} <{settings.EMAILS_FROM_EMAIL}>"
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP connections open and hands them out for reuse.
+
+    At most ``size`` connections exist at once. A connection that raised
+    while in use, or sat idle longer than ``idle_timeout``, is closed
+    instead of being reused.
+    """
+
+    def __init__(self, size: int, idle_timeout: float):
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self.connects = 0
+        self._idle: List[Tuple[float, "aiosmtplib.SMTP"]] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    async def _connect(self) -> "aiosmtplib.SMTP":
+        import aiosmtplib
+
+        if self._ssl_context is None and settings.SMTP_TLS:
+            self._ssl_context = ssl.create_default_context()
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USER or None,
+            password=settings.SMTP_PASSWORD or None,
+            use_tls=False,  # Don't use direct TLS
+            start_tls=settings.SMTP_TLS,  # Use STARTTLS for Gmail
+            tls_context=self._ssl_context
+        )
+        await smtp.connect()
+        self.connects += 1
+        return smtp
+
+    @asynccontextmanager
+    async def connection(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        async with self._semaphore:
+            smtp = None
+            while self._idle and smtp is None:
+                last_used, candidate = self._idle.pop()
+                if candidate.is_connected and time.monotonic() - last_used < self.idle_timeout:
+                    smtp = candidate
+                else:
+                    candidate.close()
+            if smtp is None:
+                smtp = await self._connect()
+
+            try:
+                yield smtp
+            except BaseException:
+                # Cancellation too: a send cut off mid-message leaves the
+                # connection in an unknown state
+                smtp.close()
+                raise
+            self._idle.append((time.monotonic(), smtp))
+
+    async def close(self) -> None:
+        while self._idle:
+            _, smtp = self._idle.pop()
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+smtp_pool = SMTPConnectionPool(settings.SMTP_POOL_SIZE, settings.SMTP_POOL_IDLE_SECONDS)
+
+def build_message(
     email_to: str,
     subject: str,
     template_name: str,
     template_data: dict
-) -> None:
+) -> MIMEMultipart:
     message = MIMEMultipart()
-    message["From"] = f"{settings.EMAILS_FROM_NAME} <{settings.EMAILS_FROM_EMAIL}>"
+    message["From"] = _from_header()
     message["To"] = email_to
     message["Subject"] = subject
 
-    # Render the email template
-    template = env.get_template(f"{template_name}.html")
-    html_content = template.render(**template_data)
-    
-    # Attach the HTML content
-    message.attach(MIMEText(html_content, "html"))
-
-    # Create SSL context
-    ssl_context = ssl.create_default_context()
-    
-    # Send the email
+    # Render the email template and attach the HTML content
+    message.attach(_html_part(render_template(template_name, template_data)))
+    return message
+
+def build_messages(
+    subject: str,
+    template_name: str,
+    recipients: Iterable[Tuple[str, dict]]
+) -> List[MIMEMultipart]:
+    """Render one message per ``(email_to, template_data)`` pair in a single pass"""
+    template = get_template(template_name)
+    from_header = _from_header()
+    messages = []
+    for email_to, template_data in recipients:
+        message = MIMEMultipart()
+        message["From"] = from_header
+        message["To"] = email_to
+        message["Subject"] = subject
+        message.attach(_html_part(template.render(**template_data)))
+        messages.append(message)
+    return messages
+
+async def send_email(
+    email_to: str,
+    subject: str,
+    template_name: str,
+    template_data: dict
+) -> None:
+    message = build_message(email_to, subject, template_name, template_data)
+
+    # Send the email over a pooled connection
+    start = time.perf_counter()
     try:
-        await aiosmtplib.send(
-            message,
-            hostname=settings.SMTP_HOST,
-            port=settings.SMTP_PORT,
-            username=settings.SMTP_USER,
-            password=settings.SMTP_PASSWORD,
-            use_tls=False,  # Don't use direct TLS
-            tls_context=ssl_context,
-            start_tls=True  # Use STARTTLS for Gmail
-        )
+        async with smtp_pool.connection() as smtp:
+            await smtp.send_message(message)
     except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
+        EMAIL_SEND_LATENCY.labels("error").observe(time.perf_counter() - start)
         logger.error(f"Failed to send email: {str(e)}")
-        raise 
+        raise
+    EMAIL_SEND_LATENCY.labels("sent").observe(time.perf_counter() - start)
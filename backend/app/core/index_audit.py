@@ -0,0 +1,119 @@
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Reports indexes that cost writes without helping reads, from the live
+# schema rather than the models: redundant ones everywhere, and on MySQL
+# unused ones from performance_schema's per-index read counters.
+
+IGNORED_TABLES = {"alembic_version"}
+
+class TableIndex(NamedTuple):
+    table: str
+    name: str  # "PRIMARY" for the primary key
+    columns: Tuple[str, ...]  # In index order; "col(n)" for MySQL prefix indexes
+    unique: bool
+
+    def __str__(self) -> str:
+        return f"{self.table}.{self.name} ({', '.join(self.columns)})"
+
+class Finding(NamedTuple):
+    kind: str  # "redundant" or "unused"
+    index: TableIndex
+    detail: str
+
+def load_indexes(connection) -> List[TableIndex]:
+    """Primary keys, indexes and unique constraints of every table"""
+    inspector = inspect(connection)
+    found = []
+    for table in inspector.get_table_names():
+        if table in IGNORED_TABLES:
+            continue
+        primary = inspector.get_pk_constraint(table)["constrained_columns"]
+        if primary:
+            found.append(TableIndex(table, "PRIMARY", tuple(primary), True))
+        names = set()
+        for index in inspector.get_indexes(table):
+            lengths = index.get("dialect_options", {}).get("mysql_length") or {}
+            columns = tuple(
+                f"{column}({lengths[column]})" if isinstance(lengths, dict) and column in lengths else column
+                for column in index["column_names"]
+            )
+            names.add(index["name"])
+            found.append(TableIndex(table, index["name"], columns, bool(index["unique"])))
+        # MySQL reports UNIQUE keys as indexes too; SQLite only here
+        for constraint in inspector.get_unique_constraints(table):
+            columns = tuple(constraint["column_names"])
+            name = constraint["name"] or f"unique({', '.join(columns)})"
+            if name not in names:
+                found.append(TableIndex(table, name, columns, True))
+    return found
+
+def covers(index: TableIndex, other: TableIndex) -> bool:
+    """Whether ``other`` makes ``index`` unnecessary: it starts with the
+    same columns and, if ``index`` enforces uniqueness, enforces the same"""
+    if index is other or index.name == "PRIMARY" or index.table != other.table:
+        return False
+    if other.columns[:len(index.columns)] != index.columns:
+        return False
+    if index.unique:
+        return other.unique and other.columns == index.columns
+    return True
+
+def redundant_indexes(indexes: List[TableIndex]) -> List[Finding]:
+    findings = []
+    for index in indexes:
+        for other in indexes:
+            if not covers(index, other):
+                continue
+            if covers(other, index) and other.name > index.name:
+                # Exact copies cover each other; keep the first by name
+                continue
+            findings.append(Finding("redundant", index, f"covered by {other}"))
+            break
+    return findings
+
+async def server_uptime(conn: AsyncConnection) -> Optional[int]:
+    row = (await conn.execute(text("SHOW GLOBAL STATUS LIKE 'Uptime'"))).first()
+    return int(row[1]) if row else None
+
+async def unused_indexes(conn: AsyncConnection, indexes: List[TableIndex]) -> List[Finding]:
+    """Indexes with no reads since the server started (MySQL only).
+
+    The counters reset on restart, so the result means little on a server
+    that has not yet seen a full cycle of the workload.
+    """
+    result = await conn.execute(
+        text(
+            "SELECT object_name, index_name, count_read "
+            "FROM performance_schema.table_io_waits_summary_by_index_usage "
+            "WHERE object_schema = DATABASE() AND index_name IS NOT NULL AND index_name <> 'PRIMARY'"
+        )
+    )
+    reads = {(table, name): count for table, name, count in result}
+    if not reads:
+        logger.warning("No index usage counters; is performance_schema enabled?")
+        return []
+    uptime = await server_uptime(conn)
+    since = f"{uptime / 3600:.1f} h" if uptime is not None else "an unknown time"
+    findings = []
+    for index in indexes:
+        if reads.get((index.table, index.name)) == 0:
+            detail = f"no reads in the {since} since the server started"
+            if index.unique:
+                detail += "; still enforces uniqueness"
+            findings.append(Finding("unused", index, detail))
+    return findings
+
+async def audit_indexes(engine: AsyncEngine) -> List[Finding]:
+    async with engine.connect() as conn:
+        indexes = await conn.run_sync(load_indexes)
+        findings = redundant_indexes(indexes)
+        if engine.dialect.name == "mysql":
+            findings.extend(await unused_indexes(conn, indexes))
+    logger.info(f"Audited {len(indexes)} indexes, {len(findings)} findings")
+    return findings
@@ -1,8 +1,17 @@
+import atexit
+import json
 import logging
-import sys
+import logging.handlers
 import os
-from datetime import datetime
-from typing import Any, Dict
+import queue
+import random
+import sys
+from typing import Optional
+
+from app.core.config import settings
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
 class ColoredFormatter(logging.Formatter):
     """Custom formatter with colors and detailed information"""
@@ -15,45 +24,136 @@ class ColoredFormatter(logging.Formatter):
     reset = "\x1b[0m"
     
     FORMATS = {
-        logging.DEBUG: grey + "%(asctime)s - %(name)s - %(levelname)s - %(message)s" + reset,
-        logging.INFO: blue + "%(asctime)s - %(name)s - %(levelname)s - %(message)s" + reset,
-        logging.WARNING: yellow + "%(asctime)s - %(name)s - %(levelname)s - %(message)s" + reset,
-        logging.ERROR: red + "%(asctime)s - %(name)s - %(levelname)s - %(message)s" + reset,
-        logging.CRITICAL: bold_red + "%(asctime)s - %(name)s - %(levelname)s - %(message)s" + reset
+        logging.DEBUG: grey + LOG_FORMAT + reset,
+        logging.INFO: blue + LOG_FORMAT + reset,
+        logging.WARNING: yellow + LOG_FORMAT + reset,
+        logging.ERROR: red + LOG_FORMAT + reset,
+        logging.CRITICAL: bold_red + LOG_FORMAT + reset
     }
 
+    def __init__(self):
+        super().__init__(LOG_FORMAT, datefmt=DATE_FORMAT)
+        # One formatter per level, built once rather than per record
+        self._formatters = {
+            level: logging.Formatter(fmt, datefmt=DATE_FORMAT)
+            for level, fmt in self.FORMATS.items()
+        }
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt, datefmt='%Y-%m-%d %H:%M:%S')
+        formatter = self._formatters.get(record.levelno)
+        if formatter is None:
+            return super().format(record)
         return formatter.format(record)
 
+# Attributes every LogRecord has; anything else came from ``extra=``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra=`` fields"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def get_file_handler(log_file: str) -> logging.Handler:
+    if settings.LOG_ROTATION == "size":
+        return logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=settings.LOG_MAX_BYTES,
+            backupCount=settings.LOG_BACKUP_COUNT
+        )
+    if settings.LOG_ROTATION == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file,
+            when=settings.LOG_ROTATION_WHEN,
+            backupCount=settings.LOG_BACKUP_COUNT
+        )
+    return logging.FileHandler(log_file)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
 def setup_logging():
     """Setup logging configuration"""
+    global _listener
+
     # Create logger
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(settings.LOG_LEVEL)
+    if _listener is not None:
+        return logger
 
     # Create console handler with custom formatter
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(ColoredFormatter())
-    logger.addHandler(console_handler)
+    if settings.LOG_FORMAT == "json":
+        console_handler.setFormatter(JsonFormatter())
+    else:
+        console_handler.setFormatter(ColoredFormatter())
 
     # Create logs directory if it doesn't exist
     logs_dir = os.path.join(os.getcwd(), 'logs')
     os.makedirs(logs_dir, exist_ok=True)
 
     # Create file handler
-    log_file = os.path.join(logs_dir, 'app.log')
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    ))
-    logger.addHandler(file_handler)
+    file_handler = get_file_handler(os.path.join(logs_dir, 'app.log'))
+    if settings.LOG_FORMAT == "json":
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+
+    if settings.LOG_ASYNC:
+        # Request handlers only enqueue records; formatting and the actual
+        # console/disk writes happen on the listener's background thread
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(
+            log_queue, console_handler, file_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+    else:
+        logger.addHandler(console_handler)
+        logger.addHandler(file_handler)
 
     # Set specific log levels for different modules
     logging.getLogger('uvicorn').setLevel(logging.INFO)
     logging.getLogger('uvicorn.access').setLevel(logging.INFO)
-    logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
+    logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO if settings.LOG_SQL else logging.WARNING)
+
+    return logger
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+access_logger = logging.getLogger("app.access")
+
+def log_request(method: str, path: str, status_code: int, elapsed: float) -> None:
+    """Log a finished request: every failed one, and a sampled fraction of
+    the successful ones.
 
-    return logger 
\ No newline at end of file
+    The sampling decision is made before any record is created, so requests
+    that are not sampled cost a single ``random()`` call.
+    """
+    if status_code >= 500:
+        access_logger.error("%s %s %s %.1fms", method, path, status_code, elapsed * 1000)
+        return
+    if status_code >= 400:
+        access_logger.warning("%s %s %s %.1fms", method, path, status_code, elapsed * 1000)
+        return
+    if random.random() >= settings.LOG_REQUEST_SAMPLE_RATE:
+        return
+    if access_logger.isEnabledFor(logging.INFO):
+        access_logger.info("%s %s %s %.1fms", method, path, status_code, elapsed * 1000)
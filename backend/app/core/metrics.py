@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.core.config import settings
+from app.core.logger import log_request
+
+logger = logging.getLogger(__name__)
+
+# Set by app.server when it starts several workers; each worker then writes
+# its metrics to files in this directory and any of them can serve the total
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route"]
+)
+REQUESTS = Counter(
+    "http_requests",
+    "HTTP responses by route and status code",
+    ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum"
+)
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_duration_seconds",
+    "Password hash/verify latency, including time queued for a worker",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0)
+)
+PASSWORD_REHASHES = Counter(
+    "password_rehashes",
+    "Stored password hashes upgraded to the current scheme or cost at login",
+    ["scheme"]
+)
+EMAIL_SEND_LATENCY = Histogram(
+    "email_send_duration_seconds",
+    "Time to hand one email to the SMTP server",
+    ["outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+class MetricsMiddleware:
+    """Records latency, status and in-flight counts for every HTTP request,
+    and hands requests to the access log, which keeps every failure and a
+    sample of the rest. Unhandled exceptions are logged with their traceback.
+
+    Plain ASGI rather than ``@app.middleware("http")`` so it adds no extra
+    task or response wrapping; the per-request cost is a few counter updates.
+    Requests are labelled with the route template (``/auth/login``), never
+    the raw path, to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            logger.exception(f"Unhandled error processing {scope['method']} {scope['path']}")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, route_path).observe(elapsed)
+            REQUESTS.labels(method, route_path, str(status_code)).inc()
+            log_request(method, scope["path"], status_code, elapsed)
+
+class AppStatsCollector:
+    """Exposes the counters kept by the pool, caches and workers at scrape time.
+
+    Those components already track their own numbers, so they are read here
+    instead of being mirrored into separate metric objects on the hot path.
+    """
+
+    def describe(self):
+        # Keeps the registry from calling collect() at registration time,
+        # before the modules read below have finished importing
+        return []
+
+    def collect(self):
+        # Imported here: these modules import this one for their histograms
+        from app.core.database import pool_stats, replicas
+        from app.core.email_outbox import outbox_worker
+        from app.core.password_hasher import password_hasher
+        from app.core.presence import presence_tracker
+        from app.core.rate_limit import rate_limiter
+        from app.core.tokens import access_token_cache
+        from app.core.usage_ingest import usage_buffer
+        from app.core.user_cache import user_cache
+
+        stats = pool_stats()
+        pool = GaugeMetricFamily("db_pool_connections", "Database pool connections by state", labels=["state"])
+        for state in ("size", "checkedin", "checkedout", "overflow"):
+            if state in stats:
+                pool.add_metric([state], stats[state])
+        yield pool
+        yield CounterMetricFamily("db_pool_checkouts", "Successful connection checkouts", value=stats["checkouts"])
+        yield CounterMetricFamily("db_pool_checkout_failures", "Failed connection checkouts", value=stats["checkout_failures"])
+        yield CounterMetricFamily("db_pool_rejected", "Checkouts rejected by the open circuit breaker", value=stats["rejected"])
+        yield CounterMetricFamily("db_pool_wait_seconds", "Total time spent waiting for a connection", value=stats["wait_seconds_total"])
+        yield GaugeMetricFamily("db_pool_wait_seconds_max", "Longest wait for a connection", value=stats["wait_seconds_max"])
+        yield GaugeMetricFamily("db_circuit_breaker_open", "1 while the database circuit breaker is open", value=int(stats["breaker_state"] == "open"))
+
+        if replicas.replicas:
+            lag = GaugeMetricFamily("db_replica_lag_seconds", "Last measured replication lag", labels=["replica"])
+            healthy = GaugeMetricFamily("db_replica_healthy", "1 while the replica receives reads", labels=["replica"])
+            reads = CounterMetricFamily("db_replica_sessions", "Read-only sessions served by the replica", labels=["replica"])
+            for replica in replicas.stats():
+                if replica["lag"] is not None:
+                    lag.add_metric([replica["name"]], replica["lag"])
+                healthy.add_metric([replica["name"]], int(replica["healthy"]))
+                reads.add_metric([replica["name"]], replica["reads"])
+            yield lag
+            yield healthy
+            yield reads
+            yield CounterMetricFamily("db_replica_primary_fallbacks", "Read-only sessions sent to the primary for lack of a healthy replica", value=replicas.primary_fallbacks)
+
+        yield GaugeMetricFamily("password_hash_in_flight", "Password operations running or queued", value=password_hasher.in_flight)
+        yield CounterMetricFamily("password_hash_rejected", "Password operations rejected with 429", value=password_hasher.rejected)
+
+        for name, cache in (("user", user_cache), ("token", access_token_cache)):
+            cache_stats = cache.stats()
+            yield GaugeMetricFamily(f"{name}_cache_entries", f"Entries in the {name} cache", value=cache_stats["size"])
+            requests = CounterMetricFamily(f"{name}_cache_requests", f"{name.capitalize()} cache lookups", labels=["result"])
+            requests.add_metric(["hit"], cache_stats["hits"])
+            requests.add_metric(["miss"], cache_stats["misses"])
+            yield requests
+
+        limits = rate_limiter.stats()
+        yield GaugeMetricFamily("rate_limit_keys", "Clients tracked by the rate limiter", value=limits["keys"])
+        rejected = CounterMetricFamily("rate_limit_rejected", "Requests rejected with 429 by rule", labels=["rule"])
+        for rule, count in limits["rejected"].items():
+            rejected.add_metric([rule], count)
+        yield rejected
+
+        emails = CounterMetricFamily("email_outbox_processed", "Outbox emails by final outcome", labels=["outcome"])
+        emails.add_metric(["sent"], outbox_worker.sent)
+        emails.add_metric(["failed"], outbox_worker.failed)
+        yield emails
+
+        usage = usage_buffer.stats()
+        yield GaugeMetricFamily("usage_buffer_records", "Usage records waiting to be flushed", value=usage["buffered"])
+        yield GaugeMetricFamily("usage_buffer_capacity", "Usage records the buffer accepts before rejecting", value=usage["capacity"])
+        records = CounterMetricFamily("usage_records", "Usage records by ingestion stage", labels=["stage"])
+        for stage in ("accepted", "rejected", "flushed", "dropped"):
+            records.add_metric([stage], usage[stage])
+        yield records
+        yield CounterMetricFamily("usage_flush_failures", "Usage flushes that failed and were retried", value=usage["flush_failures"])
+
+        presence = presence_tracker.stats()
+        yield GaugeMetricFamily("device_presence_tracked", "Devices with a heartbeat held in memory", value=presence["tracked"])
+        yield GaugeMetricFamily("device_presence_capacity", "Devices the presence tracker holds before rejecting", value=presence["capacity"])
+        yield GaugeMetricFamily("device_presence_pending", "Devices whose last_seen is waiting to be flushed", value=presence["pending"])
+        yield CounterMetricFamily("device_heartbeats", "Heartbeats recorded", value=presence["heartbeats"])
+        yield CounterMetricFamily("device_presence_flushed", "last_seen values written to the database", value=presence["flushed"])
+        yield CounterMetricFamily("device_presence_flush_failures", "Presence flushes that failed and were retried", value=presence["flush_failures"])
+
+app_stats = AppStatsCollector()
+REGISTRY.register(app_stats)
+
+# Worst case across workers rather than the sum
+MAX_ACROSS_WORKERS = {"db_pool_wait_seconds_max", "db_circuit_breaker_open"}
+
+class WorkerStatsPublisher:
+    """Copies this worker's ``AppStatsCollector`` values into gauges kept in
+    the multiprocess directory, so a scrape answered by any worker adds up
+    every live worker's pools, caches and buffers.
+
+    Counters become gauges summed over live workers; a worker's share drops
+    out when it exits, which Prometheus treats as a counter reset.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._gauges: Dict[str, Gauge] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self) -> None:
+        for family in app_stats.collect():
+            for sample in family.samples:
+                gauge = self._gauges.get(sample.name)
+                if gauge is None:
+                    mode = "livemax" if family.name in MAX_ACROSS_WORKERS else "livesum"
+                    gauge = Gauge(
+                        sample.name, family.documentation, list(sample.labels),
+                        multiprocess_mode=mode, registry=None
+                    )
+                    self._gauges[sample.name] = gauge
+                (gauge.labels(**sample.labels) if sample.labels else gauge).set(sample.value)
+
+    def start(self) -> None:
+        if MULTIPROCESS and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if MULTIPROCESS:
+            # Drops this worker's live gauges from the totals
+            multiprocess.mark_process_dead(os.getpid())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Collecting may wait on the SQLite stores' file locks
+                await asyncio.to_thread(self.publish)
+            except Exception as e:
+                logger.error(f"Publishing worker metrics failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+stats_publisher = WorkerStatsPublisher(settings.METRICS_PUBLISH_SECONDS)
+
+def render_metrics() -> bytes:
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY)
+    # The answering worker's own numbers are current; the others' are at
+    # most METRICS_PUBLISH_SECONDS old
+    stats_publisher.publish()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
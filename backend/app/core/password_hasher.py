@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_LATENCY, PASSWORD_REHASHES
+
+logger = logging.getLogger(__name__)
+
+def hash_schemes() -> list:
+    return [scheme.strip() for scheme in settings.PASSWORD_HASH_SCHEMES.split(",") if scheme.strip()]
+
+def build_pwd_context(
+    schemes: list,
+    bcrypt_rounds: int = settings.PASSWORD_BCRYPT_ROUNDS,
+    argon2_time_cost: int = settings.PASSWORD_ARGON2_TIME_COST,
+    argon2_memory_kb: int = settings.PASSWORD_ARGON2_MEMORY_KB,
+    argon2_parallelism: int = settings.PASSWORD_ARGON2_PARALLELISM
+):
+    """CryptContext that hashes with ``schemes[0]``.
+
+    Hashes in one of the other schemes, or made with a different cost, are
+    reported as needing an update. The cost is pinned with min = max so
+    lowering it is applied on login just like raising it.
+    """
+    from passlib.context import CryptContext
+    options = {}
+    if "bcrypt" in schemes:
+        options.update(
+            bcrypt__rounds=bcrypt_rounds,
+            bcrypt__min_rounds=bcrypt_rounds,
+            bcrypt__max_rounds=bcrypt_rounds
+        )
+    if "argon2" in schemes:
+        options.update(
+            argon2__rounds=argon2_time_cost,
+            argon2__min_rounds=argon2_time_cost,
+            argon2__max_rounds=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_kb,
+            argon2__parallelism=argon2_parallelism
+        )
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    # passlib and the hash backends load on the first hash or verify, in
+    # the worker thread or process that runs it
+    return build_pwd_context(hash_schemes())
+
+# Module-level so they can be pickled into process-pool workers
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+def _hash_many(passwords: list) -> list:
+    context = get_pwd_context()
+    return [context.hash(password) for password in passwords]
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(password, hashed_password)
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple:
+    return get_pwd_context().verify_and_update(password, hashed_password)
+
+def is_known_hash(hashed_password: str) -> bool:
+    """True for a well-formed hash in one of the configured schemes"""
+    context = get_pwd_context()
+    scheme = context.identify(hashed_password, required=False)
+    if scheme is None:
+        return False
+    try:
+        context.handler(scheme).from_string(hashed_password)
+    except ValueError:
+        return False
+    return True
+
+def _time_verify(context, repeat: int = 3) -> float:
+    """Fastest of ``repeat`` verifies, in seconds"""
+    hashed = context.hash("Calibrate123")
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        context.verify("Calibrate123", hashed)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+# scheme: (setting, build_pwd_context argument, lowest cost, highest cost)
+CALIBRATED_COSTS = {
+    "bcrypt": ("PASSWORD_BCRYPT_ROUNDS", "bcrypt_rounds", 4, 31),
+    "argon2": ("PASSWORD_ARGON2_TIME_COST", "argon2_time_cost", 1, 100),
+}
+
+def calibrate(scheme: str, target_seconds: float) -> tuple:
+    """Highest cost for ``scheme`` whose verify still fits ``target_seconds``
+    on this machine, as ``(setting name, cost, seconds per verify)``.
+
+    bcrypt's rounds double the work per step; argon2 keeps the configured
+    memory and parallelism and raises the time cost, which scales linearly.
+    Falls back to the cheapest cost when even that is over the target.
+    """
+    if scheme not in CALIBRATED_COSTS:
+        raise ValueError(f"Cannot calibrate password scheme: {scheme}")
+    name, argument, cost, limit = CALIBRATED_COSTS[scheme]
+
+    def time_cost(cost: int) -> float:
+        return _time_verify(build_pwd_context([scheme], **{argument: cost}))
+
+    elapsed = time_cost(cost)
+    while cost < limit:
+        next_elapsed = time_cost(cost + 1)
+        if next_elapsed > target_seconds:
+            break
+        cost, elapsed = cost + 1, next_elapsed
+    return name, cost, elapsed
+
+class PasswordHasher:
+    """Runs password hashing/verification in a bounded worker pool.
+
+    At most ``workers`` operations run at once and up to ``queue_size`` more
+    wait for a free worker; anything beyond that is rejected with a 429 so a
+    login burst cannot pile up unbounded work behind the event loop.
+    """
+
+    def __init__(self, executor_kind: str = "thread", workers: int = 1, queue_size: int = 0):
+        self.executor_kind = executor_kind
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self.in_flight = 0
+        self.rejected = 0
+        self._latency = {operation: PASSWORD_HASH_LATENCY.labels(operation) for operation in ("hash", "hash_batch", "verify")}
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hasher"
+                )
+            logger.info(f"Password hasher started with {self.workers} {self.executor_kind} workers")
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        # Only touched from the event loop thread, so a plain counter is enough
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            logger.warning(f"Password hasher saturated ({self.in_flight} in flight), rejecting {operation}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"}
+            )
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            self._latency[operation].observe(time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _hash, password)
+
+    async def hash_many(self, passwords: list, concurrency: int, batch_size: int = 32) -> list:
+        """Hash ``passwords`` in batches of ``batch_size``, with at most
+        ``concurrency`` batches on the workers at once so logins still get a
+        turn. Results are in input order."""
+        semaphore = asyncio.Semaphore(max(1, min(concurrency, self.workers)))
+
+        async def run_batch(batch: list) -> list:
+            async with semaphore:
+                return await self._run("hash_batch", _hash_many, batch)
+
+        batches = [passwords[i:i + batch_size] for i in range(0, len(passwords), batch_size)]
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return [hashed for batch in results for hashed in batch]
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", _verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple:
+        """``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+        uses an outdated scheme or cost and should replace it"""
+        valid, new_hash = await self._run("verify", _verify_and_update, password, hashed_password)
+        if new_hash is not None:
+            PASSWORD_REHASHES.labels(hash_schemes()[0]).inc()
+        return valid, new_hash
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(
+    executor_kind=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE
+)
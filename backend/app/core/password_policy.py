@@ -0,0 +1,172 @@
+import gzip
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+from typing import Iterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BLOOM_MAGIC = b"MSATBLM1"
+BLOOM_HEADER = struct.Struct("<QI")  # bits, hash functions
+
+def _bit_positions(password: str, bits: int, hashes: int) -> Iterator[int]:
+    """Double hashing: ``hashes`` positions from one BLAKE2b digest"""
+    digest = hashlib.blake2b(password.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    for i in range(hashes):
+        yield (h1 + i * h2) % bits
+
+class BreachedPasswordFilter:
+    """Bloom filter of known breached passwords, memory-mapped from a file
+    written by ``python -m app.cli build-password-filter``.
+
+    Every worker maps the same file, so the pages are shared. A hit means the
+    password is breached, or a false positive at the rate it was built with.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(BLOOM_MAGIC)] != BLOOM_MAGIC:
+            raise ValueError(f"Not a breached password filter: {path}")
+        self.bits, self.hashes = BLOOM_HEADER.unpack_from(self._map, len(BLOOM_MAGIC))
+        self._offset = len(BLOOM_MAGIC) + BLOOM_HEADER.size
+
+    def __contains__(self, password: str) -> bool:
+        for position in _bit_positions(password, self.bits, self.hashes):
+            if not self._map[self._offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+def _read_passwords(path: str) -> Iterator[str]:
+    """One password per line, from a plain or gzipped text file"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="surrogateescape") as f:
+        for line in f:
+            password = line.rstrip("\r\n")
+            if password:
+                yield password
+
+def build_breached_filter(source: str, path: str, false_positive_rate: float) -> int:
+    """Write a filter holding every password in ``source`` to ``path``,
+    replacing any previous one atomically. Returns the passwords added."""
+    count = sum(1 for _ in _read_passwords(source))
+    bits = max(8, math.ceil(-count * math.log(false_positive_rate) / math.log(2) ** 2))
+    hashes = max(1, round(bits / max(count, 1) * math.log(2)))
+
+    bitmap = bytearray((bits + 7) // 8)
+    for password in _read_passwords(source):
+        for position in _bit_positions(password, bits, hashes):
+            bitmap[position >> 3] |= 1 << (position & 7)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BLOOM_MAGIC)
+        f.write(BLOOM_HEADER.pack(bits, hashes))
+        f.write(bitmap)
+    os.replace(tmp_path, path)
+    return count
+
+class PasswordPolicy:
+    """Complexity rules for new passwords, checked in one pass over the
+    characters, plus an optional breached-password lookup.
+
+    Login does not apply the policy, so tightening it never locks anyone out.
+    """
+
+    def __init__(
+        self,
+        min_length: int,
+        require_upper: bool = True,
+        require_lower: bool = True,
+        require_digit: bool = True,
+        require_symbol: bool = False,
+        breached_filter_path: str = ""
+    ):
+        self.min_length = min_length
+        self.require_upper = require_upper
+        self.require_lower = require_lower
+        self.require_digit = require_digit
+        self.require_symbol = require_symbol
+        self.breached_filter_path = breached_filter_path
+        self._breached: Optional[BreachedPasswordFilter] = None
+        self._breached_loaded = False
+        self.message = self._describe()
+
+    def _describe(self) -> str:
+        classes = [
+            name for name, required in (
+                ("uppercase", self.require_upper),
+                ("lowercase", self.require_lower),
+                ("numbers", self.require_digit),
+                ("symbols", self.require_symbol),
+            ) if required
+        ]
+        text = f"Password must be at least {self.min_length} characters long"
+        if len(classes) > 2:
+            text += f" and contain {', '.join(classes[:-1])}, and {classes[-1]}"
+        elif classes:
+            text += f" and contain {' and '.join(classes)}"
+        return text
+
+    def _get_breached(self) -> Optional[BreachedPasswordFilter]:
+        # Mapped on first use; a missing file disables the check with a warning
+        if not self._breached_loaded:
+            self._breached_loaded = True
+            if self.breached_filter_path:
+                try:
+                    self._breached = BreachedPasswordFilter(self.breached_filter_path)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Breached password check disabled: {e}")
+        return self._breached
+
+    def check(self, password: str) -> Optional[str]:
+        """Reason the password is rejected, or None when it is acceptable"""
+        if len(password) < self.min_length:
+            return self.message
+
+        has_upper = has_lower = has_digit = has_symbol = False
+        for char in password:
+            if char.isupper():
+                has_upper = True
+            elif char.islower():
+                has_lower = True
+            elif char.isdigit():
+                has_digit = True
+            else:
+                has_symbol = True
+        if (
+            (self.require_upper and not has_upper)
+            or (self.require_lower and not has_lower)
+            or (self.require_digit and not has_digit)
+            or (self.require_symbol and not has_symbol)
+        ):
+            return self.message
+
+        breached = self._get_breached()
+        if breached is not None and password in breached:
+            return "This password has appeared in a data breach, please choose another"
+        return None
+
+    def validate(self, password: str) -> str:
+        """Pydantic validator: returns the password or raises ValueError"""
+        error = self.check(password)
+        if error is not None:
+            raise ValueError(error)
+        return password
+
+password_policy = PasswordPolicy(
+    min_length=settings.PASSWORD_MIN_LENGTH,
+    require_upper=settings.PASSWORD_REQUIRE_UPPER,
+    require_lower=settings.PASSWORD_REQUIRE_LOWER,
+    require_digit=settings.PASSWORD_REQUIRE_DIGIT,
+    require_symbol=settings.PASSWORD_REQUIRE_SYMBOL,
+    breached_filter_path=settings.PASSWORD_BREACHED_FILTER_PATH
+)
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class Rule(NamedTuple):
+    """Token bucket holding ``limit`` requests, refilled evenly over ``window`` seconds"""
+    name: str
+    limit: int
+    window: float
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.window
+
+def parse_rule(name: str, spec: str) -> Rule:
+    """``"20/60"`` means 20 requests per 60 seconds"""
+    limit, window = spec.split("/")
+    return Rule(name, int(limit), float(window))
+
+def refill(bucket: Optional[Tuple[float, float]], rule: Rule, now: float) -> float:
+    """Tokens in ``bucket`` (tokens, updated_at) at ``now``"""
+    if bucket is None:
+        return float(rule.limit)
+    return min(float(rule.limit), bucket[0] + (now - bucket[1]) * rule.rate)
+
+def take_token(bucket: Optional[Tuple[float, float]], rule: Rule, now: float) -> Tuple[Tuple[float, float], float]:
+    """Refill ``bucket`` (tokens, updated_at) up to ``now`` and try to take one token.
+
+    Returns the new bucket and how long to wait before retrying, which is 0
+    when the request is allowed.
+    """
+    tokens = refill(bucket, rule, now)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / rule.rate
+
+def peek_token(bucket: Optional[Tuple[float, float]], rule: Rule, now: float) -> float:
+    """How long until ``bucket`` has a token to take, without taking it"""
+    tokens = refill(bucket, rule, now)
+    return 0.0 if tokens >= 1 else (1 - tokens) / rule.rate
+
+class MemoryRateLimitBackend:
+    """Per-process buckets in an LRU map; the least recently seen keys are
+    evicted beyond ``max_keys``, so memory stays bounded under key floods"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def hit(self, key: str, rule: Rule) -> float:
+        bucket, retry_after = take_token(self._buckets.get(key), rule, time.monotonic())
+        self._buckets[key] = bucket
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    async def peek(self, key: str, rule: Rule) -> float:
+        return peek_token(self._buckets.get(key), rule, time.monotonic())
+
+    def reset(self) -> None:
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+class SqliteRateLimitBackend:
+    """Buckets in a local SQLite file, shared by every worker on the host.
+
+    Each hit is one read-modify-write inside an IMMEDIATE transaction, so
+    workers cannot hand out the same token twice. It runs in a thread: the
+    transaction may wait up to the 5 s busy timeout for another worker's.
+    """
+
+    def __init__(self, path: str, max_keys: int):
+        self.max_keys = max_keys
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    async def hit(self, key: str, rule: Rule) -> float:
+        # Wall clock: monotonic clocks are not comparable across processes
+        return await asyncio.to_thread(self._hit, key, rule, time.time())
+
+    def _hit(self, key: str, rule: Rule, now: float) -> float:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit WHERE key = ?", (key,)
+                ).fetchone()
+                bucket, retry_after = take_token(row, rule, now)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (key, *bucket)
+                )
+                self._writes += 1
+                if self._writes % 1000 == 0:
+                    self._prune()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return retry_after
+
+    async def peek(self, key: str, rule: Rule) -> float:
+        return await asyncio.to_thread(self._peek, key, rule, time.time())
+
+    def _peek(self, key: str, rule: Rule, now: float) -> float:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit WHERE key = ?", (key,)
+            ).fetchone()
+        return peek_token(row, rule, now)
+
+    def _prune(self) -> None:
+        self._conn.execute(
+            "DELETE FROM rate_limit WHERE key NOT IN "
+            "(SELECT key FROM rate_limit ORDER BY updated_at DESC LIMIT ?)",
+            (self.max_keys,)
+        )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_limit")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limit").fetchone()[0]
+
+class RateLimiter:
+    """Token-bucket limits keyed by rule and client (IP, username or email).
+
+    A check is a dictionary or single-row lookup, so abusive requests are
+    turned away before they reach password hashing or the email outbox.
+    Any object with async ``hit(key, rule)`` and ``peek(key, rule)``
+    returning the seconds to wait, plus ``reset()`` and ``__len__``, can
+    serve as the backend.
+    """
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.allowed = 0
+        self.rejected: Dict[str, int] = {}
+
+    async def hit(self, rule: Rule, key: str) -> float:
+        """Count one request; returns seconds to wait, or 0 if it may proceed"""
+        if not self.enabled:
+            return 0.0
+        retry_after = await self.backend.hit(f"{rule.name}:{key}", rule)
+        if retry_after:
+            self.rejected[rule.name] = self.rejected.get(rule.name, 0) + 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    async def peek(self, rule: Rule, key: str) -> float:
+        """Seconds to wait before ``key`` may make a request, without counting one"""
+        if not self.enabled:
+            return 0.0
+        retry_after = await self.backend.peek(f"{rule.name}:{key}", rule)
+        if retry_after:
+            self.rejected[rule.name] = self.rejected.get(rule.name, 0) + 1
+        return retry_after
+
+    async def check(self, rule: Rule, key: str, charge: bool = True) -> None:
+        """Like ``hit`` but raises 429 with ``Retry-After`` when over the limit.
+        Without ``charge`` the request is only checked, not counted."""
+        key = key.lower()
+        retry_after = await (self.hit(rule, key) if charge else self.peek(rule, key))
+        if retry_after:
+            logger.warning(f"Rate limit {rule.name} exceeded for {key}")
+            raise too_many_requests(retry_after)
+
+    def stats(self) -> dict:
+        return {"keys": len(self.backend), "allowed": self.allowed, "rejected": dict(self.rejected)}
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, retry later",
+        headers={"Retry-After": str(math.ceil(retry_after))}
+    )
+
+def client_ip(scope) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                # The last entry is the one our own proxy appended
+                return value.decode("latin-1").rsplit(",", 1)[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+class RateLimitMiddleware:
+    """Applies per-IP rules to specific paths before the request body is read.
+
+    Plain ASGI like ``MetricsMiddleware``: rejected requests never reach
+    routing, validation or the database.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, rules: Dict[Tuple[str, str], Rule]):
+        self.app = app
+        self.limiter = limiter
+        self.rules = rules
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            rule = self.rules.get((scope["method"], scope["path"]))
+            if rule is not None:
+                ip = client_ip(scope)
+                retry_after = await self.limiter.hit(rule, ip)
+                if retry_after:
+                    logger.warning(f"Rate limit {rule.name} exceeded for {ip}")
+                    await send({
+                        "type": "http.response.start",
+                        "status": status.HTTP_429_TOO_MANY_REQUESTS,
+                        "headers": [
+                            (b"content-type", b"application/json"),
+                            (b"retry-after", str(math.ceil(retry_after)).encode()),
+                        ],
+                    })
+                    await send({
+                        "type": "http.response.body",
+                        "body": json.dumps({"detail": "Too many requests, retry later"}).encode(),
+                    })
+                    return
+        await self.app(scope, receive, send)
+
+LOGIN_PER_IP = parse_rule("login_ip", settings.RATE_LIMIT_LOGIN_PER_IP)
+LOGIN_PER_USERNAME = parse_rule("login_username", settings.RATE_LIMIT_LOGIN_PER_USERNAME)
+REGISTER_PER_IP = parse_rule("register_ip", settings.RATE_LIMIT_REGISTER_PER_IP)
+RESET_PER_IP = parse_rule("reset_ip", settings.RATE_LIMIT_RESET_PER_IP)
+RESET_PER_EMAIL = parse_rule("reset_email", settings.RATE_LIMIT_RESET_PER_EMAIL)
+
+IP_RULES = {
+    ("POST", "/auth/login"): LOGIN_PER_IP,
+    ("POST", "/auth/register"): REGISTER_PER_IP,
+    ("POST", "/auth/request-password-reset"): RESET_PER_IP,
+}
+
+def get_rate_limit_backend():
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        logger.info(f"Using shared rate limit store at {settings.RATE_LIMIT_PATH}")
+        return SqliteRateLimitBackend(settings.RATE_LIMIT_PATH, settings.RATE_LIMIT_MAX_KEYS)
+    return MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+rate_limiter = RateLimiter(get_rate_limit_backend(), settings.RATE_LIMIT_ENABLED)
@@ -0,0 +1,26 @@
+from functools import lru_cache
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+@lru_cache(maxsize=None)
+def get_adapter(type_: Any) -> TypeAdapter:
+    """TypeAdapter for a response type such as ``List[DeviceResponse]``.
+
+    Building one compiles a validator and a serializer, so they are made
+    once per type instead of once per request.
+    """
+    return TypeAdapter(type_)
+
+def serialized_response(type_: Any, data: Any, status_code: int = 200) -> Response:
+    """Validate ``data`` (dicts or ORM objects) as ``type_`` and return it
+    rendered to JSON in a single pydantic-core pass.
+
+    Returning a ``Response`` skips FastAPI's own validate, ``dump_python``
+    and encode steps. Keep ``response_model`` on the route for the OpenAPI
+    schema.
+    """
+    adapter = get_adapter(type_)
+    body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    return Response(body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,78 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+from app.core.config import settings
+
+algorithms = [settings.ALGORITHM]
+
+@lru_cache(maxsize=1)
+def get_signer() -> tuple:
+    """``(jwt module, signing key)``, loaded on first use.
+
+    The key is built once: python-jose otherwise re-parses SECRET_KEY into a
+    key object on every encode and decode. Importing ``jose.jwk`` pulls in
+    the cryptography backends, which processes that never handle a token
+    should not pay for.
+    """
+    from jose import jwk, jwt
+    return jwt, jwk.construct(settings.SECRET_KEY, settings.ALGORITHM)
+
+def encode_token(data: dict, expires_delta: timedelta) -> str:
+    jwt, signing_key = get_signer()
+    to_encode = data.copy()
+    to_encode.update({"exp": datetime.utcnow() + expires_delta})
+    return jwt.encode(to_encode, signing_key, algorithm=settings.ALGORITHM)
+
+def decode_token(token: str) -> dict:
+    """Verify a token's signature and claims; raises JWTError when invalid"""
+    jwt, signing_key = get_signer()
+    return jwt.decode(token, signing_key, algorithms=algorithms)
+
+class VerifiedTokenCache:
+    """Bounded LRU of already-verified token payloads.
+
+    Entries are keyed by a SHA-256 of the token, so raw bearer tokens are
+    never kept in memory, and expire at the token's own ``exp`` claim.
+    Payloads are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+    def decode(self, token: str) -> dict:
+        if self.max_entries <= 0:
+            self.misses += 1
+            return decode_token(token)
+
+        key = hashlib.sha256(token.encode()).digest()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+
+        self.misses += 1
+        payload = decode_token(token)
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            self._entries[key] = (exp, payload)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+access_token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_MAX_ENTRIES)
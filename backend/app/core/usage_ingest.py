@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.core.config import settings
+from app.core.database import session_scope
+from app.core.usage_rollups import apply_rollups
+from app.models.usage import UsageRecord
+
+logger = logging.getLogger(__name__)
+
+class IngestBufferFull(Exception):
+    """Raised when accepting more records would exceed the buffer capacity"""
+
+class UsageIngestBuffer:
+    """In-memory buffer that writes usage records to MySQL in large batches.
+
+    Handlers only append validated rows; a background task flushes them once
+    ``flush_size`` rows are waiting or every ``flush_interval`` seconds,
+    using one multi-row INSERT per ``flush_size`` rows and one commit per
+    flush. Each flush also folds its rows into the minute/hour/day rollup
+    tables. When the database falls behind the buffer fills up to
+    ``max_records`` and ``add`` starts rejecting, which the API reports to
+    clients as backpressure. Rows still buffered when the process dies are
+    lost, so the interval bounds how much can go missing.
+
+    A failed flush keeps its rows for the next one only when the error may
+    pass, like a lost connection. Rows the database rejects would fail every
+    retry and fill the buffer, so the batch is split in halves until each
+    such row is alone, and those rows are logged and dropped.
+    """
+
+    def __init__(self, max_records: int, flush_size: int, flush_interval: float):
+        self.max_records = max_records
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.flush_failures = 0
+        self.dropped = 0
+        self._rows: List[dict] = []
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, rows: List[dict]) -> None:
+        if len(self._rows) + len(rows) > self.max_records:
+            self.rejected += len(rows)
+            raise IngestBufferFull(f"Usage buffer holds {len(self._rows)} of {self.max_records} records")
+        self._rows.extend(rows)
+        self.accepted += len(rows)
+        if len(self._rows) >= self.flush_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+            logger.info("Usage ingest flusher started")
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out whatever is still buffered"""
+        if self._task is not None:
+            # Not cancelled: a flush interrupted mid-INSERT would drop its rows
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._stopping = False
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Dropping {len(self._rows)} buffered usage records: {str(e)}")
+        logger.info("Usage ingest flusher stopped")
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Usage flush failed: {str(e)}")
+                # Back off before retrying so a down database is not hammered
+                await asyncio.sleep(self.flush_interval)
+
+    async def _write(self, rows: List[dict]) -> None:
+        async with session_scope() as db:
+            for start in range(0, len(rows), self.flush_size):
+                await db.execute(UsageRecord.__table__.insert(), rows[start:start + self.flush_size])
+            # Same transaction, so rollups never count a record that was not stored
+            await apply_rollups(db, rows)
+            await db.commit()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows written"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            pending = [rows]
+            written = 0
+            while pending:
+                chunk = pending.pop()
+                try:
+                    await self._write(chunk)
+                except (DataError, IntegrityError) as e:
+                    if len(chunk) == 1:
+                        self.dropped += 1
+                        logger.error(f"Dropping usage record the database rejects: {chunk[0]} ({e.orig})")
+                        continue
+                    middle = len(chunk) // 2
+                    pending += [chunk[middle:], chunk[:middle]]
+                    continue
+                except Exception:
+                    # Put the rows back in front of anything added meanwhile
+                    self.flush_failures += 1
+                    self._rows = [row for part in [chunk] + pending[::-1] for row in part] + self._rows
+                    raise
+                written += len(chunk)
+            self.flushed += written
+            return written
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._rows),
+            "capacity": self.max_records,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "flush_failures": self.flush_failures,
+            "dropped": self.dropped,
+        }
+
+usage_buffer = UsageIngestBuffer(
+    max_records=settings.USAGE_BUFFER_MAX_RECORDS,
+    flush_size=settings.USAGE_FLUSH_SIZE,
+    flush_interval=settings.USAGE_FLUSH_INTERVAL_SECONDS
+)
@@ -0,0 +1,84 @@
+import logging
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.models.usage import UsageRecord
+
+logger = logging.getLogger(__name__)
+
+# Monthly RANGE COLUMNS partitions on usage_records.recorded_at (MySQL only).
+# Range queries prune to the months they touch, and old data can be dropped a
+# month at a time with DROP PARTITION instead of a huge DELETE. A catch-all
+# ``pmax`` partition keeps inserts working if the monthly ones run out.
+
+TABLE = UsageRecord.__tablename__
+
+def month_start(moment: datetime, offset: int = 0) -> datetime:
+    month = moment.year * 12 + moment.month - 1 + offset
+    return datetime(month // 12, month % 12 + 1, 1)
+
+def partition_name(start: datetime) -> str:
+    return f"p{start:%Y%m}"
+
+def partition_clause(start: datetime) -> str:
+    return f"PARTITION {partition_name(start)} VALUES LESS THAN ('{month_start(start, 1):%Y-%m-%d}')"
+
+def monthly_partitions(first: datetime, months: int) -> List[str]:
+    return [partition_clause(month_start(first, offset)) for offset in range(months)]
+
+def partition_usage_records(connection) -> None:
+    """Partition the freshly created raw usage table; used by the initial
+    migration and by ``create_all``"""
+    if connection.dialect.name != "mysql":
+        return
+    # MySQL requires the partitioning column in every unique key
+    connection.execute(text(f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, recorded_at)"))
+    partitions = monthly_partitions(month_start(datetime.utcnow()), settings.USAGE_PARTITION_MONTHS_AHEAD + 1)
+    partitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    connection.execute(text(f"ALTER TABLE {TABLE} PARTITION BY RANGE COLUMNS(recorded_at) ({', '.join(partitions)})"))
+    logger.info(f"Partitioned {TABLE} by month")
+
+@event.listens_for(UsageRecord.__table__, "after_create")
+def partition_after_create(target, connection, **kw):
+    partition_usage_records(connection)
+
+async def ensure_usage_partitions(engine: AsyncEngine, months_ahead: int) -> int:
+    """Split ``pmax`` so monthly partitions exist ``months_ahead`` months out.
+
+    Safe to run on every startup; returns the number of partitions added.
+    ``pmax`` normally holds no rows, so the reorganize is a metadata change.
+    """
+    if engine.dialect.name != "mysql":
+        return 0
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT partition_name FROM information_schema.partitions "
+                "WHERE table_schema = DATABASE() AND table_name = :table AND partition_name IS NOT NULL"
+            ),
+            {"table": TABLE}
+        )
+        existing = {row[0] for row in result}
+        if "pmax" not in existing:
+            logger.warning(f"{TABLE} is not partitioned, skipping partition maintenance")
+            return 0
+        current = month_start(datetime.utcnow())
+        missing = [
+            month_start(current, offset)
+            for offset in range(months_ahead + 1)
+            if partition_name(month_start(current, offset)) not in existing
+        ]
+        # Only months past the newest existing partition can be split out of pmax
+        newest = max((name for name in existing if name != "pmax"), default="")
+        missing = [start for start in missing if partition_name(start) > newest]
+        if not missing:
+            return 0
+        clauses = [partition_clause(start) for start in missing]
+        clauses.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+        await conn.execute(text(f"ALTER TABLE {TABLE} REORGANIZE PARTITION pmax INTO ({', '.join(clauses)})"))
+    logger.info(f"Added {len(missing)} monthly partitions to {TABLE}")
+    return len(missing)
@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.database import dialect_name, upsert
+from app.models.usage import UsageRecord, UsageRollupMinute, UsageRollupHour, UsageRollupDay
+
+# Coarsest first; query planning relies on this order
+LEVELS = (
+    ("day", UsageRollupDay, timedelta(days=1)),
+    ("hour", UsageRollupHour, timedelta(hours=1)),
+    ("minute", UsageRollupMinute, timedelta(minutes=1)),
+)
+ROLLUP_MODELS = {name: model for name, model, _ in LEVELS}
+BUCKET_SIZES = {name: size for name, _, size in LEVELS}
+
+def floor_time(moment: datetime, level: str) -> datetime:
+    if level == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if level == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def ceil_time(moment: datetime, level: str) -> datetime:
+    floored = floor_time(moment, level)
+    return floored if floored == moment else floored + BUCKET_SIZES[level]
+
+def _accumulate(table):
+    """``also_set`` for a rollup upsert: merge the incoming bucket into the stored one"""
+    # SQLite spells the two-argument LEAST/GREATEST as MIN/MAX
+    least, greatest = (func.min, func.max) if dialect_name == "sqlite" else (func.least, func.greatest)
+    return lambda new: {
+        "count": table.c.count + new.count,
+        "total": table.c.total + new.total,
+        "min_value": least(table.c.min_value, new.min_value),
+        "max_value": greatest(table.c.max_value, new.max_value),
+    }
+
+ROLLUP_UPSERTS = {
+    name: upsert(
+        model.__table__,
+        conflict_columns=["user_id", "metric", "bucket_start", "device_id"],
+        update_columns=[],
+        also_set=_accumulate(model.__table__)
+    )
+    for name, model, _ in LEVELS
+}
+
+def aggregate(rows: List[dict]) -> Dict[str, List[dict]]:
+    """Fold raw usage rows into minute/hour/day rollup rows.
+
+    Output rows are sorted by primary key so concurrent flushes from several
+    workers lock rollup rows in the same order and cannot deadlock.
+    """
+    buckets = {name: {} for name in ROLLUP_MODELS}
+    minute_acc, hour_acc, day_acc = buckets["minute"], buckets["hour"], buckets["day"]
+    for row in rows:
+        value = row["value"]
+        minute = row["recorded_at"].replace(second=0, microsecond=0)
+        hour = minute.replace(minute=0)
+        day = hour.replace(hour=0)
+        user_id, metric, device_id = row["user_id"], row["metric"], row["device_id"] or 0
+        for acc, bucket in ((minute_acc, minute), (hour_acc, hour), (day_acc, day)):
+            key = (user_id, metric, bucket, device_id)
+            entry = acc.get(key)
+            if entry is None:
+                acc[key] = [1, value, value, value]
+            else:
+                entry[0] += 1
+                entry[1] += value
+                if value < entry[2]:
+                    entry[2] = value
+                if value > entry[3]:
+                    entry[3] = value
+
+    return {
+        name: [
+            {
+                "user_id": key[0],
+                "metric": key[1],
+                "bucket_start": key[2],
+                "device_id": key[3],
+                "count": entry[0],
+                "total": entry[1],
+                "min_value": entry[2],
+                "max_value": entry[3],
+            }
+            for key, entry in sorted(acc.items())
+        ]
+        for name, acc in buckets.items()
+    }
+
+async def apply_rollups(db: AsyncSession, rows: List[dict]) -> None:
+    """Add raw rows to every rollup level; runs in the caller's transaction"""
+    for name, rollup_rows in aggregate(rows).items():
+        if rollup_rows:
+            await db.execute(ROLLUP_UPSERTS[name], rollup_rows)
+
+def plan_ranges(start: datetime, end: datetime) -> List[Tuple[str, datetime, datetime]]:
+    """Cover ``[start, end)`` with the fewest rollup buckets, coarsest first.
+
+    Returns ``(level, range_start, range_end)`` pieces; an edge that does not
+    line up with even a minute boundary is read from the raw table.
+    """
+    if start >= end:
+        return []
+    for name, _, _ in LEVELS:
+        inner_start = ceil_time(start, name)
+        inner_end = floor_time(end, name)
+        if inner_start < inner_end:
+            return plan_ranges(start, inner_start) + [(name, inner_start, inner_end)] + plan_ranges(inner_end, end)
+    return [("raw", start, end)]
+
+async def query_totals(
+    db: AsyncSession,
+    user_id: int,
+    metric: str,
+    start: datetime,
+    end: datetime,
+    device_id: Optional[int] = None
+) -> dict:
+    """Count/sum/min/max of a metric over ``[start, end)`` using the rollup plan.
+
+    Every piece of the plan is one branch of a single UNION ALL, so a query
+    costs one round trip however the range is split.
+    """
+    plan = plan_ranges(start, end)
+    pieces = []
+    for level, range_start, range_end in plan:
+        if level == "raw":
+            table = UsageRecord
+            piece = select(
+                func.count(), func.sum(table.value), func.min(table.value), func.max(table.value)
+            ).where(table.recorded_at >= range_start, table.recorded_at < range_end)
+        else:
+            table = ROLLUP_MODELS[level]
+            piece = select(
+                func.sum(table.count), func.sum(table.total), func.min(table.min_value), func.max(table.max_value)
+            ).where(table.bucket_start >= range_start, table.bucket_start < range_end)
+        piece = piece.where(table.user_id == user_id, table.metric == metric)
+        if device_id is not None:
+            piece = piece.where(table.device_id == device_id)
+        pieces.append(piece)
+
+    count, total, minimum, maximum = 0, 0.0, None, None
+    if len(pieces) > 1:
+        results = (await db.execute(union_all(*pieces))).all()
+    else:
+        results = [(await db.execute(pieces[0])).one()] if pieces else []
+    for piece_count, piece_total, piece_min, piece_max in results:
+        if not piece_count:
+            continue
+        count += int(piece_count)
+        total += piece_total
+        minimum = piece_min if minimum is None else min(minimum, piece_min)
+        maximum = piece_max if maximum is None else max(maximum, piece_max)
+
+    return {
+        "count": count,
+        "total": total,
+        "min": minimum,
+        "max": maximum,
+        "sources": [level for level, _, _ in plan],
+    }
+
+async def query_series(
+    db: AsyncSession,
+    user_id: int,
+    metric: str,
+    interval: str,
+    start: datetime,
+    end: datetime,
+    device_id: Optional[int] = None
+) -> List[dict]:
+    """Per-bucket aggregates read straight from the ``interval`` rollup.
+
+    ``start`` and ``end`` are widened to whole buckets.
+    """
+    table = ROLLUP_MODELS[interval]
+    query = (
+        select(
+            table.bucket_start,
+            func.sum(table.count),
+            func.sum(table.total),
+            func.min(table.min_value),
+            func.max(table.max_value),
+        )
+        .where(
+            table.user_id == user_id,
+            table.metric == metric,
+            table.bucket_start >= floor_time(start, interval),
+            table.bucket_start < ceil_time(end, interval),
+        )
+        .group_by(table.bucket_start)
+        .order_by(table.bucket_start)
+    )
+    if device_id is not None:
+        query = query.where(table.device_id == device_id)
+
+    result = await db.execute(query)
+    return [
+        {"bucket_start": bucket_start, "count": int(count), "total": total, "min": minimum, "max": maximum}
+        for bucket_start, count, total, minimum, maximum in result.all()
+    ]
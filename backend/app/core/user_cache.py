@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime
+
+from app.core.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+DATETIME_COLUMNS = frozenset(
+    column.key for column in User.__table__.columns if isinstance(column.type, DateTime)
+)
+
+def dump_values(values: dict) -> str:
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in values.items()
+    })
+
+def load_values(data: str) -> dict:
+    values = json.loads(data)
+    for key in DATETIME_COLUMNS:
+        if values.get(key) is not None:
+            values[key] = datetime.fromisoformat(values[key])
+    return values
+
+class MemoryUserCacheBackend:
+    """Per-process LRU store of ``key -> (expires_at, value)``"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, value: dict, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SqliteUserCacheBackend:
+    """Store in a local SQLite file so every worker on the host shares entries
+    and sees invalidations made by the others. Reads and writes run in a
+    thread, since they may wait on another worker's write lock.
+
+    Entries are the user's column values as JSON, never pickles: whoever
+    can write the file must not be able to run code in the workers.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        # Earlier versions kept pickled entries in user_cache; never read them
+        self._conn.execute("DROP TABLE IF EXISTS user_cache")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_entries "
+            "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    async def get(self, key: str) -> Optional[tuple]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: dict, expires_at: float) -> None:
+        await asyncio.to_thread(self._set, key, value, expires_at)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    def _get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, value FROM user_entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], load_values(row[1])
+
+    def _set(self, key: str, value: dict, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO user_entries (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, expires_at, dump_values(value))
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        self._conn.execute("DELETE FROM user_entries WHERE expires_at < ?", (time.time(),))
+        self._conn.execute(
+            "DELETE FROM user_entries WHERE key NOT IN "
+            "(SELECT key FROM user_entries ORDER BY expires_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM user_entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM user_entries")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM user_entries").fetchone()[0]
+
+class UserCache:
+    """TTL cache of authenticated user rows keyed by username.
+
+    Entries hold plain column values; every hit builds a fresh, detached
+    ``User`` so requests never share (or accidentally flush) one instance.
+    """
+
+    def __init__(self, backend, ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, username: str) -> Optional[User]:
+        if self.ttl_seconds <= 0:
+            self.misses += 1
+            return None
+        entry = await self.backend.get(username)
+        if entry is None or entry[0] < time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return User(**entry[1])
+
+    async def set(self, user: User) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        values = {column.key: getattr(user, column.key) for column in User.__table__.columns}
+        await self.backend.set(user.username, values, time.time() + self.ttl_seconds)
+
+    async def invalidate(self, username: str) -> None:
+        self.invalidations += 1
+        await self.backend.delete(username)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+def get_user_cache_backend():
+    if settings.USER_CACHE_BACKEND == "sqlite":
+        logger.info(f"Using shared user cache at {settings.USER_CACHE_PATH}")
+        return SqliteUserCacheBackend(settings.USER_CACHE_PATH, settings.USER_CACHE_MAX_ENTRIES)
+    return MemoryUserCacheBackend(settings.USER_CACHE_MAX_ENTRIES)
+
+user_cache = UserCache(get_user_cache_backend(), settings.USER_CACHE_TTL_SECONDS)
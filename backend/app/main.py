@@ -1,26 +1,65 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.database import engine
-from app.models.base import Base
-from app.routers import auth
+from app.core.database import dispose_engine, warm_pool, DatabaseUnavailable
+from app.routers import admin, auth, devices, usage
 from app.core.config import settings
 from app.core.logger import setup_logging
-import time
+from app.core.metrics import MetricsMiddleware, render_metrics, stats_publisher, CONTENT_TYPE_LATEST
+from app.core.rate_limit import RateLimitMiddleware, rate_limiter, IP_RULES
+from app.core.password_hasher import password_hasher
+from app.core.email_outbox import outbox_worker
+from app.core.email_service import smtp_pool, warm_templates
+from app.core.presence import presence_tracker
+from app.core.usage_ingest import usage_buffer
+from contextlib import asynccontextmanager
 import logging
 
 # Setup logging
 logger = setup_logging()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm caches and start background workers; on shutdown, after the server
+    has drained in-flight requests, flush and stop them and close the pool.
+
+    The schema is not touched here: run ``python -m app.cli migrate`` once
+    per deploy instead of in every worker.
+    """
+    logger.info("Starting up application...")
+    opened = await warm_pool(settings.DB_POOL_WARM)
+    logger.info(f"Database pool warmed with {opened} connections")
+    warm_templates()
+    outbox_worker.start()
+    usage_buffer.start()
+    presence_tracker.start()
+    stats_publisher.start()
+    yield
+    logger.info("Shutting down application...")
+    await stats_publisher.stop()
+    await presence_tracker.stop()
+    await usage_buffer.stop()
+    await outbox_worker.stop()
+    await smtp_pool.close()
+    password_hasher.shutdown()
+    await dispose_engine()
+    logger.info("Shutdown complete")
+
 app = FastAPI(
     title="Msat Manager Backend",
     description="Backend API for MSAT Manager",
     version="1.0.0",
     swagger_ui_init_oauth={
         "usePkceWithAuthorizationCodeGrant": True
-    }
+    },
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Inside CORS, so browsers can read the 429s it returns
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, rules=IP_RULES)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -30,37 +69,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Middleware to log all requests"""
-    start_time = time.time()
-    
-    # Log request
-    logger.info(f"Request: {request.method} {request.url.path}")
-    logger.debug(f"Headers: {request.headers}")
-    
-    try:
-        response = await call_next(request)
-        
-        # Log response
-        process_time = time.time() - start_time
-        logger.info(f"Response: {response.status_code} - {process_time:.2f}s")
-        
-        return response
-    except Exception as e:
-        logger.error(f"Error processing request: {str(e)}")
-        raise
+# Outermost, so the timing covers CORS handling as well
+app.add_middleware(MetricsMiddleware)
 
-@app.on_event("startup")
-async def startup():
-    logger.info("Starting up application...")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("Database tables created successfully")
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database temporarily unavailable"},
+        headers={"Retry-After": str(int(settings.DB_BREAKER_RESET_SECONDS))}
+    )
 
 # Include routers
 app.include_router(auth.router)
 logger.info("Auth router included")
+app.include_router(devices.router)
+logger.info("Devices router included")
+app.include_router(usage.router)
+logger.info("Usage router included")
+app.include_router(admin.router)
+logger.info("Admin router included")
+
+# Plain def: FastAPI runs it in the threadpool, because collecting reads the
+# SQLite rate limit and user cache stores, which may wait on a file lock
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/")
 async def root():
@@ -1 +1,25 @@
- 
\ No newline at end of file
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.sql import func
+from .base import Base
+
+class Device(Base):
+    __tablename__ = "devices"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    device_uid = Column(String(64), nullable=False)  # Identifier reported by the device itself
+    name = Column(String(100))
+    device_type = Column(String(50))
+    firmware_version = Column(String(50))
+    status = Column(String(20), nullable=False, default="active")
+    attributes = Column(JSON)
+    last_seen = Column(DateTime)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Upsert conflict target; also serves the user_id foreign key
+        UniqueConstraint("user_id", "device_uid", name="uq_devices_user_device_uid"),
+        # Keyset pagination: WHERE user_id = ? AND id > ? ORDER BY id
+        Index("ix_devices_user_id_id", "user_id", "id"),
+    )
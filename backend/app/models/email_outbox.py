@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from sqlalchemy.sql import func
+from .base import Base
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    email_to = Column(String(100), nullable=False)
+    subject = Column(String(200), nullable=False)
+    template_name = Column(String(100), nullable=False)
+    template_data = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, sent or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String(500))
+    next_attempt_at = Column(DateTime, nullable=False)
+    sent_at = Column(DateTime)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
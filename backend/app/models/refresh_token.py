@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from .base import Base
+
+class RefreshToken(Base):
+    """One row per issued refresh token, so each can be used exactly once.
+
+    Rows are only read when a token is presented to ``/auth/refresh``;
+    access tokens are checked against ``User.token_version`` instead.
+    """
+    __tablename__ = "refresh_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    expires_at = Column(DateTime, nullable=False)  # UTC
+    used_at = Column(DateTime)  # Set when rotated; presenting it again revokes every session
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
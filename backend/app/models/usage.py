@@ -1 +1,59 @@
- 
\ No newline at end of file
+from sqlalchemy import Column, BigInteger, Integer, String, Float, DateTime, Index
+from sqlalchemy.ext.declarative import declared_attr
+from .base import Base
+
+# Renders as FLOAT(53), which MySQL stores as DOUBLE; plain Float is single precision
+Double = Float(precision=53)
+
+class UsageRecord(Base):
+    __tablename__ = "usage_records"
+
+    # BIGINT on MySQL; SQLite only auto-increments INTEGER primary keys.
+    # On MySQL the table is range-partitioned by month on recorded_at (see
+    # app.core.usage_partitions), which widens the primary key to
+    # (id, recorded_at).
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # No foreign keys: this is the highest-volume insert path, per-row FK
+    # checks would cost more than they protect, and MySQL does not allow
+    # them on partitioned tables
+    user_id = Column(Integer, nullable=False)
+    device_id = Column(Integer)
+    metric = Column(String(50), nullable=False)
+    value = Column(Double, nullable=False)
+    recorded_at = Column(DateTime, nullable=False)  # UTC
+
+    __table_args__ = (
+        Index("ix_usage_records_user_metric_time", "user_id", "metric", "recorded_at"),
+    )
+
+class UsageRollupMixin:
+    """Pre-aggregated usage per user, metric, time bucket and device.
+
+    Rows are maintained incrementally as records are flushed, so queries
+    over long ranges read a handful of buckets instead of raw records.
+    """
+
+    user_id = Column(Integer, primary_key=True)
+    metric = Column(String(50), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)  # UTC, aligned to the bucket size
+    device_id = Column(Integer, primary_key=True)  # 0 for records without a device
+    count = Column(BigInteger, nullable=False)
+    total = Column(Double, nullable=False)
+    min_value = Column(Double, nullable=False)
+    max_value = Column(Double, nullable=False)
+
+    @declared_attr
+    def __table_args__(cls):
+        # The primary key serves per-user totals; this serves per-device ones
+        return (
+            Index(f"ix_{cls.__tablename__}_device", "user_id", "device_id", "metric", "bucket_start"),
+        )
+
+class UsageRollupMinute(UsageRollupMixin, Base):
+    __tablename__ = "usage_rollup_minute"
+
+class UsageRollupHour(UsageRollupMixin, Base):
+    __tablename__ = "usage_rollup_hour"
+
+class UsageRollupDay(UsageRollupMixin, Base):
+    __tablename__ = "usage_rollup_day"
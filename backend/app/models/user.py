@@ -1,13 +1,22 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy.sql import func
 from .base import Base
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String(50), unique=True, index=True)
-    email = Column(String(100), unique=True, index=True)
+    id = Column(Integer, primary_key=True)
+    username = Column(String(50))
+    email = Column(String(100))
     hashed_password = Column(String(200))
+    # Embedded in every token; bumping it revokes all of the user's tokens
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Each unique index also serves lookups by that column; a second,
+        # plain index on it would only slow down writes
+        Index("uq_users_username", "username", unique=True),
+        Index("uq_users_email", "email", unique=True),
+    )
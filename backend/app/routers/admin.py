@@ -0,0 +1,157 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import ValidationError
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.password_hasher import password_hasher
+from app.core.serialization import serialized_response
+from app.models.user import User
+from app.routers.auth import get_admin_user
+from app.schemas.user import UserImport, UserImportResult
+from typing import List
+import csv
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+INSERT_USERS = insert(User.__table__)
+
+def parse_import(body: bytes, content_type: str) -> List[dict]:
+    """Rows of a JSON array or a CSV file with a header line"""
+    try:
+        if "csv" in content_type:
+            reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+            # Empty cells mean "not given", as a missing JSON key would
+            return [{key: value for key, value in row.items() if value} for row in reader]
+        rows = json.loads(body)
+    except (UnicodeDecodeError, csv.Error, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unreadable upload: {str(e)}")
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array of objects")
+    return rows
+
+def describe_errors(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}"
+        for item in error.errors(include_url=False)
+    )
+
+@router.post(
+    "/users/bulk",
+    response_model=UserImportResult,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": UserImport.model_json_schema()}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+            "required": True,
+        }
+    }
+)
+async def bulk_import_users(
+    request: Request,
+    dry_run: bool = Query(False, description="Validate and check for conflicts without creating anyone"),
+    admin: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create many accounts at once from a JSON array or a CSV upload.
+
+    Each row has ``username``, ``email`` and either ``password`` or a
+    ``hashed_password`` from another system. Rows are validated one by one
+    and checked against each other and, in a single query, against existing
+    accounts. The valid rows are hashed in batches on the password hasher
+    and inserted with multi-row INSERTs in one transaction. Every row gets
+    a status in the report: ``created`` (``valid`` on a dry run),
+    ``invalid``, ``duplicate`` within the upload, or ``exists``.
+    """
+    rows = parse_import(await request.body(), request.headers.get("content-type", ""))
+    if len(rows) > settings.USER_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.USER_IMPORT_MAX_ROWS} users per import"
+        )
+
+    report = []
+    accepted = []  # (report entry, UserImport)
+    seen_usernames, seen_emails = set(), set()
+    for number, row in enumerate(rows, start=1):
+        try:
+            user = UserImport.model_validate(row)
+        except ValidationError as e:
+            report.append({"row": number, "username": row.get("username"), "status": "invalid", "detail": describe_errors(e)})
+            continue
+        # MySQL's unique indexes ignore case, so compare the same way
+        username, email = user.username.lower(), user.email.lower()
+        entry = {"row": number, "username": user.username, "status": "valid"}
+        report.append(entry)
+        if username in seen_usernames or email in seen_emails:
+            entry.update(status="duplicate", detail="Username or email repeats an earlier row")
+            continue
+        seen_usernames.add(username)
+        seen_emails.add(email)
+        accepted.append((entry, user))
+
+    if accepted:
+        result = await db.execute(
+            # The utf8mb4_unicode_ci columns already compare without case, and
+            # a plain IN keeps the unique indexes usable
+            select(User.username, User.email).where(or_(
+                User.username.in_([user.username for _, user in accepted]),
+                User.email.in_([user.email for _, user in accepted])
+            ))
+        )
+        taken_usernames, taken_emails = set(), set()
+        for username, email in result:
+            taken_usernames.add(username.lower())
+            taken_emails.add(email.lower())
+        remaining = []
+        for entry, user in accepted:
+            if user.username.lower() in taken_usernames:
+                entry.update(status="exists", detail="Username already registered")
+            elif user.email.lower() in taken_emails:
+                entry.update(status="exists", detail="Email already registered")
+            else:
+                remaining.append((entry, user))
+        accepted = remaining
+
+    created = 0
+    if accepted and not dry_run:
+        to_hash = [user.password for _, user in accepted if user.password is not None]
+        hashes = iter(await password_hasher.hash_many(to_hash, settings.USER_IMPORT_HASH_CONCURRENCY))
+        values = [
+            {
+                "username": user.username,
+                "email": user.email,
+                "hashed_password": next(hashes) if user.password is not None else user.hashed_password,
+            }
+            for _, user in accepted
+        ]
+        chunk_size = settings.USER_IMPORT_CHUNK_SIZE
+        try:
+            for start in range(0, len(values), chunk_size):
+                await db.execute(INSERT_USERS, values[start:start + chunk_size])
+            await db.commit()
+        except IntegrityError:
+            # Someone registered one of these names since the check above
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Accounts were created concurrently with the import; nothing was imported, please retry"
+            )
+        for entry, _ in accepted:
+            entry["status"] = "created"
+        created = len(accepted)
+
+    logger.info(
+        f"User import by {admin.username}: {len(rows)} rows, {created} created"
+        + (" (dry run)" if dry_run else "")
+    )
+    return serialized_response(UserImportResult, {"received": len(rows), "created": created, "rows": report})
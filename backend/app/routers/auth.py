@@ -1,22 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Form
 from fastapi.responses import HTMLResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
+from app.core.database import get_db, session_scope
+from app.models.refresh_token import RefreshToken
 from app.models.user import User
 from app.schemas.user import (
     UserCreate, UserLogin, Token, PasswordChange,
-    PasswordResetRequest, PasswordReset
+    PasswordResetRequest, PasswordReset, RefreshRequest, LogoutRequest
 )
-from passlib.context import CryptContext
-from jose import jwt, JWTError
+from jose import JWTError
 from app.core.config import settings
 from sqlalchemy.future import select
-import re
+import secrets
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.email_service import send_email
-from sqlalchemy import update
+from app.core.email_outbox import enqueue_email, outbox_worker
+from app.core.password_hasher import password_hasher
+from app.core.password_policy import password_policy
+from app.core.rate_limit import rate_limiter, LOGIN_PER_USERNAME, RESET_PER_EMAIL
+from app.core.user_cache import user_cache
+from app.core.tokens import encode_token, decode_token, access_token_cache
+from sqlalchemy import delete, or_, update
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,85 +29,139 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["auth"])
 security = HTTPBearer()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def validate_password(password: str) -> bool:
-    """Validate password complexity"""
-    if len(password) < 8:
-        return False
-    if not re.search(r"[A-Z]", password):
-        return False
-    if not re.search(r"[a-z]", password):
-        return False
-    if not re.search(r"\d", password):
-        return False
-    return True
-
 async def get_user(db: AsyncSession, username: str):
     result = await db.execute(select(User).where(User.username == username))
     return result.scalars().first()
 
+ACCESS_TOKEN_EXPIRE = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+REFRESH_TOKEN_EXPIRE = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+RESET_TOKEN_EXPIRE = timedelta(minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES)
+
+# Every token carries the user's token_version as "ver"; bumping the column
+# revokes all of them. Tokens issued before "type"/"ver" existed count as
+# access tokens of version 0.
 def create_access_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return encode_token({**data, "type": "access"}, ACCESS_TOKEN_EXPIRE)
 
 def create_reset_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return encode_token({**data, "type": "reset"}, RESET_TOKEN_EXPIRE)
+
+def issue_tokens(db: AsyncSession, user: User) -> dict:
+    """Access and refresh token pair for ``user``; the refresh token row is
+    added to ``db`` and the caller commits it"""
+    jti = secrets.token_hex(16)
+    db.add(RefreshToken(
+        jti=jti,
+        user_id=user.id,
+        expires_at=datetime.utcnow() + REFRESH_TOKEN_EXPIRE
+    ))
+    claims = {"sub": user.username, "ver": user.token_version}
+    return {
+        "access_token": create_access_token(claims),
+        "refresh_token": encode_token({**claims, "jti": jti, "type": "refresh"}, REFRESH_TOKEN_EXPIRE),
+        "token_type": "bearer",
+        "expires_in": int(ACCESS_TOKEN_EXPIRE.total_seconds()),
+    }
+
+async def revoke_all_tokens(db: AsyncSession, user: User) -> int:
+    """Bump the user's token version, invalidating every access, refresh and
+    reset token issued so far. Returns the new version; the caller commits."""
+    await db.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(token_version=User.token_version + 1)
+    )
+    result = await db.execute(select(User.token_version).where(User.id == user.id))
+    return result.scalar_one()
 
 @router.post("/register", response_model=Token)
 async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
-    if not validate_password(user.password):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Password must be at least 8 characters long and contain uppercase, lowercase, and numbers"
-        )
-    
-    db_user = await get_user(db, user.username)
-    if db_user:
+    # The password policy already ran while validating UserCreate.
+    # One query checks both unique columns, before the costly hash
+    result = await db.execute(
+        select(User.username).where(or_(User.username == user.username, User.email == user.email))
+    )
+    # MySQL compares case-insensitively, so match the same way here
+    taken = {username.lower() for username in result.scalars()}
+    if taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
+            detail="Username already registered" if user.username.lower() in taken else "Email already registered"
         )
     
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     new_user = User(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password
     )
     db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
+    await db.flush()
     
-    access_token = create_access_token({"sub": new_user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    tokens = issue_tokens(db, new_user)
+    await db.commit()
+    return tokens
 
 @router.post("/login", response_model=Token)
 async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
+    # Per-IP limits are applied by RateLimitMiddleware; this one stops
+    # guessing one account's password from many addresses. Only failed
+    # attempts use up the bucket, so the owner's own logins never lock it
+    await rate_limiter.check(LOGIN_PER_USERNAME, user.username, charge=False)
     db_user = await get_user(db, user.username)
-    if not db_user or not pwd_context.verify(user.password, db_user.hashed_password):
+    valid, new_hash = False, None
+    if db_user:
+        valid, new_hash = await password_hasher.verify_and_update(user.password, db_user.hashed_password)
+    if not valid:
+        await rate_limiter.hit(LOGIN_PER_USERNAME, user.username.lower())
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
     
-    access_token = create_access_token({"sub": db_user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    # The stored hash uses an old scheme or cost; replace it while the
+    # plain password is at hand
+    if new_hash is not None:
+        db_user.hashed_password = new_hash
+    tokens = issue_tokens(db, db_user)
+    await db.commit()
+    if new_hash is not None:
+        await user_cache.invalidate(db_user.username)
+        logger.info(f"Password hash upgraded for user: {db_user.username}")
+    return tokens
+
+async def load_user(username: str) -> Optional[User]:
+    """Detached user row, from the user cache when possible.
+
+    Cache misses read from the primary, never a replica: a lagging replica
+    would still return the ``token_version`` from before a revocation, and
+    caching it would keep revoked tokens working.
+    """
+    user = await user_cache.get(username)
+    if user is not None:
+        return user
+
+    async with session_scope() as db:
+        user = await get_user(db, username)
+    if user is not None:
+        await user_cache.set(user)
+    return user
 
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
+    """Resolve the bearer token to a user, served from the user cache when possible.
+
+    Revocation is checked against the cached ``token_version``, so it costs
+    no extra query. The returned ``User`` is detached from any session;
+    write changes to it with an explicit UPDATE and invalidate the cache
+    entry afterwards.
+    """
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = access_token_cache.decode(token)
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("type", "access") != "access":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials"
@@ -113,14 +172,97 @@ async def get_current_user(
             detail="Invalid authentication credentials"
         )
     
-    user = await get_user(db, username)
+    user = await load_user(username)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
+    if payload.get("ver", 0) != user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked"
+        )
     return user
 
+ADMIN_USERNAMES = frozenset(name.strip() for name in settings.ADMIN_USERNAMES.split(",") if name.strip())
+
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """``get_current_user``, restricted to the accounts in ADMIN_USERNAMES"""
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+def decode_refresh_token(token: str) -> dict:
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        payload = {}
+    if payload.get("type") != "refresh" or not payload.get("sub") or not payload.get("jti"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+    return payload
+
+@router.post("/refresh", response_model=Token)
+async def refresh(request: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Exchange a refresh token for a new token pair without a password check.
+
+    Each refresh token works once. Presenting one that was already rotated
+    means it was copied, so every session of the user is revoked.
+    """
+    payload = decode_refresh_token(request.refresh_token)
+    user = await load_user(payload["sub"])
+    if user is None or payload.get("ver", 0) != user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has been revoked"
+        )
+
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.jti == payload["jti"], RefreshToken.used_at.is_(None))
+        .values(used_at=datetime.utcnow())
+    )
+    if result.rowcount != 1:
+        # A missing row was logged out or pruned; a used one was stolen
+        used = await db.execute(select(RefreshToken.jti).where(RefreshToken.jti == payload["jti"]))
+        if used.first() is not None:
+            logger.warning(f"Refresh token reused for user: {user.username}; revoking all sessions")
+            await revoke_all_tokens(db, user)
+            await db.commit()
+            await user_cache.invalidate(user.username)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has been revoked"
+        )
+
+    tokens = issue_tokens(db, user)
+    await db.commit()
+    return tokens
+
+@router.post("/logout")
+async def logout(request: LogoutRequest, db: AsyncSession = Depends(get_db)):
+    """Revoke one refresh token, or with ``all_sessions`` every token of the user"""
+    payload = decode_refresh_token(request.refresh_token)
+    user = await load_user(payload["sub"])
+    if user is None or payload.get("ver", 0) != user.token_version:
+        # Already revoked; logging out again is not an error
+        return {"message": "Logged out"}
+
+    if request.all_sessions:
+        await revoke_all_tokens(db, user)
+    else:
+        await db.execute(delete(RefreshToken).where(RefreshToken.jti == payload["jti"]))
+    await db.commit()
+    if request.all_sessions:
+        await user_cache.invalidate(user.username)
+    return {"message": "Logged out"}
+
 @router.post("/change-password")
 async def change_password(
     password_change: PasswordChange,
@@ -128,24 +270,26 @@ async def change_password(
     db: AsyncSession = Depends(get_db)
 ):
     # Verify current password
-    if not pwd_context.verify(password_change.current_password, current_user.hashed_password):
+    if not await password_hasher.verify(password_change.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Current password is incorrect"
         )
     
-    # Validate new password
-    if not validate_password(password_change.new_password):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="New password must be at least 8 characters long and contain uppercase, lowercase, and numbers"
-        )
-    
-    # Hash and update new password
-    current_user.hashed_password = pwd_context.hash(password_change.new_password)
+    # Hash and update new password; tokens issued before the change stop
+    # working, and this session continues with the pair returned here
+    hashed_password = await password_hasher.hash(password_change.new_password)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(hashed_password=hashed_password)
+    )
+    current_user.token_version = await revoke_all_tokens(db, current_user)
+    tokens = issue_tokens(db, current_user)
     await db.commit()
+    await user_cache.invalidate(current_user.username)
     
-    return {"message": "Password changed successfully"}
+    return {"message": "Password changed successfully", **tokens}
 
 @router.post("/request-password-reset")
 async def request_password_reset(
@@ -154,6 +298,8 @@ async def request_password_reset(
     fastapi_request: Request = None
 ):
     logger.info(f"Password reset requested for email: {request.email}")
+    # Caps the emails any one mailbox can be sent, whoever asks
+    await rate_limiter.check(RESET_PER_EMAIL, request.email)
     
     # Find user by email
     result = await db.execute(select(User).where(User.email == request.email))
@@ -165,7 +311,7 @@ async def request_password_reset(
         return {"message": "None existent email!"}
     
     # Create reset token
-    reset_token = create_reset_token({"sub": user.email})
+    reset_token = create_reset_token({"sub": user.email, "ver": user.token_version})
     logger.debug(f"Reset token created for user: {user.username}")
     
     # Get current base URL (e.g., http://your-domain.com)
@@ -173,26 +319,22 @@ async def request_password_reset(
     
     # Create reset URL (in production, replace with your frontend URL)
     reset_url = f"{base_url}/auth/reset-password?token={reset_token}"
-    print("reset_url:", reset_url)
+    logger.debug(f"Reset URL created for user: {user.username}")
     
-    try:
-        # Send email
-        await send_email(
-            email_to=user.email,
-            subject="Reset Your Password",
-            template_name="reset_password",
-            template_data={
-                "reset_url": reset_url,
-                "expiration_minutes": settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES
-            }
-        )
-        logger.info(f"Reset password email sent to: {user.email}")
-    except Exception as e:
-        logger.error(f"Failed to send reset password email: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to send reset password email"
-        )
+    # Queue the email; the outbox worker delivers it after the commit
+    enqueue_email(
+        db,
+        email_to=user.email,
+        subject="Reset Your Password",
+        template_name="reset_password",
+        template_data={
+            "reset_url": reset_url,
+            "expiration_minutes": settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES
+        }
+    )
+    await db.commit()
+    outbox_worker.wake()
+    logger.info(f"Reset password email queued for: {user.email}")
     
     return {"message": "If your email is registered, you will receive a password reset link"}
 
@@ -224,9 +366,9 @@ async def reset_password(
     
     try:
         # Verify token
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("type", "reset") != "reset":
             logger.warning("Invalid reset token: missing email")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -249,18 +391,29 @@ async def reset_password(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+
+    # The reset bumps token_version, so each link works only once
+    if payload.get("ver", 0) != user.token_version:
+        logger.warning(f"Reused or revoked reset token for user: {user.username}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired reset token"
+        )
     
-    # Validate new password
-    if not validate_password(new_password):
+    # Form fields skip the PasswordReset schema, so the policy runs here
+    error = password_policy.check(new_password)
+    if error is not None:
         logger.warning(f"Invalid password format for user: {user.username}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Password must be at least 8 characters long and contain uppercase, lowercase, and numbers"
+            detail=error
         )
     
     # Update password
-    user.hashed_password = pwd_context.hash(new_password)
+    user.hashed_password = await password_hasher.hash(new_password)
+    await revoke_all_tokens(db, user)
     await db.commit()
+    await user_cache.invalidate(user.username)
     logger.info(f"Password successfully reset for user: {user.username}")
     
     return {"message": "Password has been reset successfully"} 
\ No newline at end of file
@@ -0,0 +1,173 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+from app.core.config import settings
+from app.core.database import get_db, get_read_db, session_scope, upsert
+from app.core.export import export_response
+from app.core.presence import presence_tracker, PresenceFull
+from app.core.serialization import serialized_response
+from app.models.device import Device
+from app.models.user import User
+from app.routers.auth import get_current_user
+from app.schemas.device import (
+    DeviceBulkUpsert, DeviceBulkResult, DevicePage,
+    DeviceHeartbeat, DeviceHeartbeatResult, DevicePresenceList
+)
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+import math
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/devices", tags=["devices"])
+
+UPSERT_STATEMENT = upsert(
+    Device.__table__,
+    conflict_columns=["user_id", "device_uid"],
+    update_columns=["name", "device_type", "firmware_version", "status", "attributes"],
+    also_set={"updated_at": func.now()}
+)
+
+@router.post("/bulk", response_model=DeviceBulkResult)
+async def bulk_upsert_devices(
+    payload: DeviceBulkUpsert,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Register or update many devices at once.
+
+    Devices are matched on ``device_uid``; every field in the payload
+    overwrites the stored value. Rows are written with multi-row upserts of
+    ``DEVICE_UPSERT_CHUNK_SIZE`` rows inside a single transaction.
+    """
+    # A device listed twice would hit the same row twice in one statement;
+    # keep the last occurrence
+    rows = {}
+    for device in payload.devices:
+        rows[device.device_uid] = {"user_id": current_user.id, **device.model_dump()}
+    rows = list(rows.values())
+
+    chunk_size = settings.DEVICE_UPSERT_CHUNK_SIZE
+    for start in range(0, len(rows), chunk_size):
+        await db.execute(UPSERT_STATEMENT, rows[start:start + chunk_size])
+    await db.commit()
+    logger.info(f"Upserted {len(rows)} devices for user: {current_user.username}")
+
+    return {"received": len(payload.devices), "upserted": len(rows)}
+
+@router.get("", response_model=DevicePage)
+async def list_devices(
+    after: Optional[int] = Query(None, description="Return devices with an id greater than this"),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """List the caller's devices in id order using keyset pagination"""
+    query = select(Device).where(Device.user_id == current_user.id)
+    if after is not None:
+        query = query.where(Device.id > after)
+    result = await db.execute(query.order_by(Device.id).limit(limit))
+    devices = result.scalars().all()
+
+    next_after = devices[-1].id if len(devices) == limit else None
+    return serialized_response(DevicePage, {"items": devices, "next_after": next_after})
+
+EXPORT_COLUMNS = (
+    "id", "device_uid", "name", "device_type", "firmware_version", "status",
+    "attributes", "last_seen", "created_at", "updated_at",
+)
+
+@router.get("/export")
+async def export_devices(
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    gzip: bool = Query(False, description="Compress the download with gzip"),
+    current_user: User = Depends(get_current_user)
+):
+    """Download all of the caller's devices in id order, streamed from a server-side cursor"""
+    table = Device.__table__
+    query = (
+        select(*(table.c[column] for column in EXPORT_COLUMNS))
+        .where(table.c.user_id == current_user.id)
+        .order_by(table.c.id)
+    )
+    logger.info(f"Device export ({format}) requested by user: {current_user.username}")
+    return export_response(query, EXPORT_COLUMNS, format, gzip, "devices")
+
+@router.post("/heartbeat", response_model=DeviceHeartbeatResult)
+async def heartbeat(
+    payload: DeviceHeartbeat,
+    current_user: User = Depends(get_current_user)
+):
+    """Mark devices as seen now.
+
+    Recorded in memory and written to ``last_seen`` within
+    ``DEVICE_PRESENCE_FLUSH_SECONDS``. Only the first heartbeat of a device
+    on a worker queries the database, to check it belongs to the caller.
+    """
+    now = time.time()
+    untracked = presence_tracker.record(payload.device_ids, current_user.id, now)
+    unknown = []
+    if untracked:
+        async with session_scope() as db:
+            result = await db.execute(
+                select(Device.id).where(Device.user_id == current_user.id, Device.id.in_(list(set(untracked))))
+            )
+            owned = set(result.scalars())
+        try:
+            presence_tracker.track(owned, current_user.id, now)
+        except PresenceFull as e:
+            logger.warning(str(e))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many devices online, retry later",
+                headers={"Retry-After": str(math.ceil(settings.DEVICE_PRESENCE_FLUSH_SECONDS))}
+            )
+        unknown = [device_id for device_id in untracked if device_id not in owned]
+    return {
+        "received": len(payload.device_ids),
+        "recorded": len(payload.device_ids) - len(unknown),
+        "unknown": unknown,
+    }
+
+@router.get("/presence", response_model=DevicePresenceList)
+async def device_presence(
+    device_id: List[int] = Query(..., max_length=1000, description="Repeat for each device"),
+    current_user: User = Depends(get_current_user)
+):
+    """Whether each of the caller's devices sent a heartbeat in the last
+    ``DEVICE_OFFLINE_AFTER_SECONDS``, with the time of the latest one.
+
+    Devices this worker has seen online are answered from memory. The rest
+    may have reported to another worker, so their stored ``last_seen`` is
+    read in one query; it trails heartbeats by at most one flush interval.
+    Ids that are not the caller's devices are left out.
+    """
+    now = time.time()
+    offline_after = settings.DEVICE_OFFLINE_AFTER_SECONDS
+    seen = {requested: presence_tracker.last_seen(requested, current_user.id) for requested in device_id}
+    stale = [requested for requested, last in seen.items() if last is None or now - last > offline_after]
+    if stale:
+        async with session_scope(read_only=True) as db:
+            result = await db.execute(
+                select(Device.id, Device.last_seen).where(Device.user_id == current_user.id, Device.id.in_(stale))
+            )
+            stored = dict(result.all())
+        for requested in stale:
+            if requested not in stored:
+                del seen[requested]
+            elif stored[requested] is not None:
+                stored_at = stored[requested].replace(tzinfo=timezone.utc).timestamp()
+                seen[requested] = max(seen[requested] or 0.0, stored_at)
+
+    items = [
+        {
+            "device_id": requested,
+            "online": last is not None and now - last <= offline_after,
+            "last_seen": datetime.utcfromtimestamp(last) if last is not None else None,
+        }
+        for requested, last in seen.items()
+    ]
+    return serialized_response(DevicePresenceList, {"items": items})
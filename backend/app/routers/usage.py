@@ -0,0 +1,237 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.config import settings
+from app.core.database import get_read_db
+from app.core.export import export_response
+from app.core.serialization import serialized_response
+from app.core.usage_ingest import usage_buffer, IngestBufferFull
+from app.core.usage_rollups import BUCKET_SIZES, query_totals, query_series
+from app.models.usage import UsageRecord
+from app.models.user import User
+from app.routers.auth import get_current_user
+from app.schemas.usage import UsageRecordIn, UsageIngestResult, UsageTotals, UsageSeries
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+# Validate straight from the raw body bytes; skips the json.loads + dict walk
+# FastAPI would do for a body parameter
+record_adapter = TypeAdapter(UsageRecordIn)
+batch_adapter = TypeAdapter(List[UsageRecordIn])
+
+NDJSON_ADD_EVERY = 1000  # records parsed from a stream before they are handed to the buffer
+
+def to_utc(moment: datetime) -> datetime:
+    """Naive UTC, as stored; naive input is taken to be UTC already"""
+    if moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def to_row(record: UsageRecordIn, user_id: int, received_at: datetime) -> dict:
+    recorded_at = received_at if record.recorded_at is None else to_utc(record.recorded_at)
+    return {
+        "user_id": user_id,
+        "device_id": record.device_id,
+        "metric": record.metric,
+        "value": record.value,
+        "recorded_at": recorded_at,
+    }
+
+def buffer_full(accepted: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail={
+            "message": "Usage ingestion is saturated, retry later",
+            "accepted": accepted,
+            "buffered": len(usage_buffer),
+            "capacity": usage_buffer.max_records,
+        },
+        headers={"Retry-After": str(math.ceil(settings.USAGE_FLUSH_INTERVAL_SECONDS))}
+    )
+
+def invalid_record(errors: list, accepted: int) -> HTTPException:
+    """422 for an NDJSON stream, saying how many records before the bad
+    line were kept so the client can resume after them"""
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail={
+            "message": "Invalid usage record",
+            "accepted": accepted,
+            "errors": jsonable_encoder(errors),
+        }
+    )
+
+async def ingest_ndjson(request: Request, user_id: int, received_at: datetime) -> int:
+    """Validate and buffer an NDJSON body as it streams in.
+
+    Records are added every ``NDJSON_ADD_EVERY`` lines, so if the buffer
+    fills mid-stream the records before that point stay accepted.
+    """
+    accepted = 0
+    line_number = 0
+    rows = []
+    pending = b""
+    try:
+        async for chunk in request.stream():
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                line_number += 1
+                if line.strip():
+                    rows.append(to_row(record_adapter.validate_json(line), user_id, received_at))
+            if len(rows) >= NDJSON_ADD_EVERY:
+                usage_buffer.add(rows)
+                accepted += len(rows)
+                rows = []
+        if pending.strip():
+            line_number += 1
+            rows.append(to_row(record_adapter.validate_json(pending), user_id, received_at))
+        if rows:
+            usage_buffer.add(rows)
+            accepted += len(rows)
+    except ValidationError as e:
+        errors = e.errors(include_url=False)
+        for error in errors:
+            error["loc"] = ("body", line_number, *error["loc"])
+        logger.warning(f"Rejected NDJSON usage stream at line {line_number}, {accepted} records already accepted")
+        raise invalid_record(errors, accepted)
+    except IngestBufferFull:
+        raise buffer_full(accepted)
+    return accepted
+
+@router.post(
+    "/ingest",
+    response_model=UsageIngestResult,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": UsageRecordIn.model_json_schema()}},
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+            "required": True,
+        }
+    }
+)
+async def ingest_usage(request: Request, current_user: User = Depends(get_current_user)):
+    """Accept a batch of usage records for asynchronous storage.
+
+    Send a JSON array, or ``application/x-ndjson`` with one record per line
+    for large uploads. Records are buffered and written in bulk shortly
+    after; a 429 means the buffer is full and the client should back off.
+    A 422 for NDJSON carries the number of records accepted before the bad
+    line; a JSON array larger than the whole buffer gets 413.
+    """
+    received_at = datetime.utcnow()
+    if "ndjson" in request.headers.get("content-type", ""):
+        accepted = await ingest_ndjson(request, current_user.id, received_at)
+    else:
+        try:
+            records = batch_adapter.validate_json(await request.body())
+        except ValidationError as e:
+            errors = e.errors(include_url=False)
+            for error in errors:
+                error["loc"] = ("body", *error["loc"])
+            raise RequestValidationError(errors)
+        if len(records) > usage_buffer.max_records:
+            # Would be refused however empty the buffer got, so retrying cannot help
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {usage_buffer.max_records} records per request; send larger uploads as NDJSON"
+            )
+        try:
+            usage_buffer.add([to_row(record, current_user.id, received_at) for record in records])
+        except IngestBufferFull:
+            raise buffer_full(0)
+        accepted = len(records)
+
+    return {"accepted": accepted, "buffered": len(usage_buffer), "capacity": usage_buffer.max_records}
+
+def query_range(start: datetime, end: datetime):
+    start, end = to_utc(start), to_utc(end)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+    return start, end
+
+@router.get("/totals", response_model=UsageTotals)
+async def usage_totals(
+    metric: str = Query(..., max_length=50),
+    start: datetime = Query(...),
+    end: datetime = Query(..., description="Exclusive"),
+    device_id: Optional[int] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Count, sum, min and max of a metric over ``[start, end)``.
+
+    The range is answered from the coarsest rollup buckets that fit inside
+    it, with finer buckets (and, below a minute, raw records) for the edges.
+    Records still waiting in the ingest buffer are not included.
+    """
+    start, end = query_range(start, end)
+    totals = await query_totals(db, current_user.id, metric, start, end, device_id)
+    return serialized_response(UsageTotals, {"metric": metric, "start": start, "end": end, **totals})
+
+@router.get("/series", response_model=UsageSeries)
+async def usage_series(
+    metric: str = Query(..., max_length=50),
+    interval: Literal["minute", "hour", "day"] = Query(...),
+    start: datetime = Query(...),
+    end: datetime = Query(..., description="Exclusive"),
+    device_id: Optional[int] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Per-bucket aggregates of a metric, read from the ``interval`` rollup.
+
+    ``start`` and ``end`` are widened to whole buckets; empty buckets are
+    omitted.
+    """
+    start, end = query_range(start, end)
+    if (end - start) / BUCKET_SIZES[interval] > settings.USAGE_QUERY_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range spans more than {settings.USAGE_QUERY_MAX_BUCKETS} {interval} buckets, use a coarser interval"
+        )
+    buckets = await query_series(db, current_user.id, metric, interval, start, end, device_id)
+    return serialized_response(UsageSeries, {"metric": metric, "interval": interval, "buckets": buckets})
+
+EXPORT_COLUMNS = ("id", "device_id", "metric", "value", "recorded_at")
+
+@router.get("/export")
+async def export_usage(
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    gzip: bool = Query(False, description="Compress the download with gzip"),
+    metric: Optional[str] = Query(None, max_length=50),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None, description="Exclusive"),
+    device_id: Optional[int] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """Download the caller's raw usage records, oldest first.
+
+    Rows are streamed from a server-side cursor, so exports of any size use
+    constant memory. Records still in the ingest buffer are not included.
+    """
+    table = UsageRecord.__table__
+    query = select(*(table.c[column] for column in EXPORT_COLUMNS)).where(table.c.user_id == current_user.id)
+    if metric is not None:
+        query = query.where(table.c.metric == metric)
+    if start is not None:
+        query = query.where(table.c.recorded_at >= to_utc(start))
+    if end is not None:
+        query = query.where(table.c.recorded_at < to_utc(end))
+    if device_id is not None:
+        query = query.where(table.c.device_id == device_id)
+
+    logger.info(f"Usage export ({format}) requested by user: {current_user.username}")
+    return export_response(query.order_by(table.c.recorded_at), EXPORT_COLUMNS, format, gzip, "usage")
@@ -1 +1,49 @@
- 
\ No newline at end of file
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+class DeviceBase(BaseModel):
+    device_uid: str = Field(..., min_length=1, max_length=64)
+    name: Optional[str] = Field(None, max_length=100)
+    device_type: Optional[str] = Field(None, max_length=50)
+    firmware_version: Optional[str] = Field(None, max_length=50)
+    status: str = Field("active", max_length=20)
+    attributes: Optional[Dict[str, Any]] = None
+
+class DeviceUpsert(DeviceBase):
+    pass
+
+class DeviceBulkUpsert(BaseModel):
+    devices: List[DeviceUpsert] = Field(..., min_length=1, max_length=10000)
+
+class DeviceBulkResult(BaseModel):
+    received: int
+    upserted: int
+
+class DeviceResponse(DeviceBase):
+    id: int
+    last_seen: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class DevicePage(BaseModel):
+    items: List[DeviceResponse]
+    next_after: Optional[int] = None  # Pass as ``after`` to fetch the next page
+
+class DeviceHeartbeat(BaseModel):
+    device_ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+class DeviceHeartbeatResult(BaseModel):
+    received: int
+    recorded: int
+    unknown: List[int]  # Ids that are not devices of the caller
+
+class DevicePresence(BaseModel):
+    device_id: int
+    online: bool
+    last_seen: Optional[datetime] = None  # UTC
+
+class DevicePresenceList(BaseModel):
+    items: List[DevicePresence]
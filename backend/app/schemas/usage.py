@@ -1 +1,39 @@
- 
\ No newline at end of file
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import datetime
+
+# Largest value of a MySQL INT column
+INT_MAX = 2147483647
+
+class UsageRecordIn(BaseModel):
+    metric: str = Field(..., min_length=1, max_length=50)
+    value: float = Field(..., allow_inf_nan=False)  # MySQL cannot store NaN or infinity
+    device_id: Optional[int] = Field(None, ge=1, le=INT_MAX)
+    recorded_at: Optional[datetime] = None  # Defaults to the time the server received it
+
+class UsageIngestResult(BaseModel):
+    accepted: int
+    buffered: int  # Records waiting to be written, across all clients
+    capacity: int
+
+class UsageTotals(BaseModel):
+    metric: str
+    start: datetime
+    end: datetime
+    count: int
+    total: float
+    min: Optional[float] = None
+    max: Optional[float] = None
+    sources: List[str]  # Table read for each piece of the range: day, hour, minute or raw
+
+class UsageBucket(BaseModel):
+    bucket_start: datetime
+    count: int
+    total: float
+    min: float
+    max: float
+
+class UsageSeries(BaseModel):
+    metric: str
+    interval: Literal["minute", "hour", "day"]
+    buckets: List[UsageBucket]
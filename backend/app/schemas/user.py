@@ -1,27 +1,27 @@
-from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator, model_validator
+from typing import List, Literal, Optional
 from datetime import datetime
 
+from app.core.password_hasher import is_known_hash
+from app.core.password_policy import password_policy
+
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
     email: EmailStr
 
 class UserCreate(UserBase):
-    password: str = Field(..., min_length=8, max_length=100)
+    password: str = Field(..., max_length=100)
     
-    @validator('password')
+    @field_validator('password')
+    @classmethod
     def password_strength(cls, v):
-        if not any(c.isupper() for c in v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        if not any(c.islower() for c in v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        if not any(c.isdigit() for c in v):
-            raise ValueError('Password must contain at least one number')
-        return v
+        # The policy also enforces the minimum length, which is configurable
+        return password_policy.validate(v)
 
 class UserLogin(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
-    password: str = Field(..., min_length=8, max_length=100)
+    # No policy or minimum here: passwords set before they applied still log in
+    password: str = Field(..., max_length=100)
 
 class UserUpdate(BaseModel):
     username: Optional[str] = Field(None, min_length=3, max_length=50)
@@ -33,46 +33,79 @@ class UserInDB(UserBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserResponse(UserInDB):
     pass
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: str
+    all_sessions: bool = False  # Also revoke every other token issued to the user
 
 class TokenData(BaseModel):
     username: Optional[str] = None
 
 class PasswordChange(BaseModel):
-    current_password: str = Field(..., min_length=8, max_length=100)
-    new_password: str = Field(..., min_length=8, max_length=100)
+    current_password: str = Field(..., max_length=100)
+    new_password: str = Field(..., max_length=100)
     
-    @validator('new_password')
+    @field_validator('new_password')
+    @classmethod
     def password_strength(cls, v):
-        if not any(c.isupper() for c in v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        if not any(c.islower() for c in v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        if not any(c.isdigit() for c in v):
-            raise ValueError('Password must contain at least one number')
-        return v
+        return password_policy.validate(v)
 
 class PasswordResetRequest(BaseModel):
     email: EmailStr
 
 class PasswordReset(BaseModel):
     token: str
-    new_password: str = Field(..., min_length=8, max_length=100)
+    new_password: str = Field(..., max_length=100)
     
-    @validator('new_password')
+    @field_validator('new_password')
+    @classmethod
+    def password_strength(cls, v):
+        return password_policy.validate(v)
+
+class UserImport(UserBase):
+    """One row of a bulk import: a new password, or a hash carried over from
+    another system in one of the configured schemes"""
+    password: Optional[str] = Field(None, max_length=100)
+    hashed_password: Optional[str] = Field(None, max_length=200)
+
+    @field_validator('password')
+    @classmethod
     def password_strength(cls, v):
-        if not any(c.isupper() for c in v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        if not any(c.islower() for c in v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        if not any(c.isdigit() for c in v):
-            raise ValueError('Password must contain at least one number')
-        return v 
\ No newline at end of file
+        return v if v is None else password_policy.validate(v)
+
+    @field_validator('hashed_password')
+    @classmethod
+    def known_hash(cls, v):
+        if v is not None and not is_known_hash(v):
+            raise ValueError('Unrecognised password hash')
+        return v
+
+    @model_validator(mode='after')
+    def one_password(self):
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError('Give either password or hashed_password')
+        return self
+
+class UserImportRow(BaseModel):
+    row: int  # 1-based position in the upload
+    username: Optional[str] = None
+    status: Literal["created", "valid", "invalid", "duplicate", "exists"]
+    detail: Optional[str] = None
+
+class UserImportResult(BaseModel):
+    received: int
+    created: int
+    rows: List[UserImportRow]
@@ -0,0 +1,70 @@
+"""Run the API under uvicorn.
+
+    python -m app.server
+
+In development this is a single auto-reloading process. Otherwise it starts
+``SERVER_WORKERS`` processes (default: one per available CPU) on uvloop and
+httptools, without the file watcher. On SIGTERM each worker stops accepting
+connections, waits up to ``SERVER_GRACEFUL_TIMEOUT_SECONDS`` for in-flight
+requests, then runs the lifespan shutdown in ``app.main``.
+
+With several workers, Prometheus metrics are kept in files under
+``PROMETHEUS_MULTIPROC_DIR`` (a private temporary directory unless set), so
+``/metrics`` on any worker reports all of them.
+"""
+import importlib.util
+import os
+import tempfile
+
+import uvicorn
+
+from app.core.config import settings
+
+def available_cpus() -> int:
+    # Honours CPU pinning (taskset, container cpusets), unlike os.cpu_count()
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def worker_count() -> int:
+    if settings.ENVIRONMENT == "development":
+        return 1
+    return settings.SERVER_WORKERS or available_cpus()
+
+def prepare_metrics_dir() -> None:
+    """Point the workers at an empty multiprocess metrics directory; files
+    left by a previous run would be added to this one's totals"""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="msat-metrics-")
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+def main() -> None:
+    development = settings.ENVIRONMENT == "development"
+    workers = worker_count()
+    # Each worker has its own password hashing pool; split the CPUs between
+    # them rather than giving every worker one thread per CPU
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, available_cpus() // workers)))
+    if workers > 1:
+        prepare_metrics_dir()
+
+    uvicorn.run(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        reload=development,
+        # Fall back to the pure-Python implementations where the C ones are missing
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        lifespan="on",
+        # Requests are already logged (sampled) by MetricsMiddleware
+        access_log=False,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    )
+
+if __name__ == "__main__":
+    main()
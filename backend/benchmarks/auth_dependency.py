@@ -0,0 +1,48 @@
+"""Per-request cost of the ``get_current_user`` dependency.
+
+Compares the verified-token cache against decoding the JWT on every call.
+The user cache is primed first so neither mode touches the database.
+
+    python -m benchmarks.auth_dependency --iterations 20000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core.tokens import access_token_cache
+from app.core.user_cache import user_cache
+from app.models.user import User
+from app.routers.auth import create_access_token, get_current_user
+
+async def measure(credentials: HTTPAuthorizationCredentials, iterations: int) -> float:
+    await get_current_user(credentials)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await get_current_user(credentials)
+    return (time.perf_counter() - start) / iterations
+
+async def main(iterations: int) -> None:
+    await user_cache.set(User(id=1, username="benchmark", email="benchmark@example.com", hashed_password="x", token_version=0))
+    token = create_access_token({"sub": "benchmark"})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    max_entries = access_token_cache.max_entries
+    access_token_cache.max_entries = 0
+    uncached = await measure(credentials, iterations)
+
+    access_token_cache.max_entries = max_entries or 10000
+    access_token_cache.clear()
+    cached = await measure(credentials, iterations)
+
+    print(f"iterations:       {iterations}")
+    print(f"uncached decode:  {uncached * 1e6:8.1f} us/request")
+    print(f"cached decode:    {cached * 1e6:8.1f} us/request")
+    print(f"speedup:          {uncached / cached:8.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
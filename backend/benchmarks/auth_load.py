@@ -0,0 +1,236 @@
+"""Load test for the auth API: register, login, token refresh, authenticated
+requests, password reset requests and password resets at a fixed concurrency.
+
+Runs the app in-process over httpx's ASGI transport against DATABASE_URL
+(SQLite for a quick local run, or a scratch MySQL database). Each scenario
+sends ``--requests`` requests from ``--concurrency`` concurrent clients and
+reports throughput and p50/p95/p99 latency. Rate limiting is switched off
+and the outbox worker is not started, so reset emails are only queued.
+
+Results can be written to JSON and compared with an earlier run, failing
+when p95 latency or throughput regress by more than ``--threshold``:
+
+    DATABASE_URL=sqlite+aiosqlite:///auth-load.db \\
+        python -m benchmarks.auth_load --requests 500 --concurrency 32 --output before.json
+    ...change routers/auth.py...
+    DATABASE_URL=sqlite+aiosqlite:///auth-load.db \\
+        python -m benchmarks.auth_load --requests 500 --concurrency 32 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import select
+
+from app.core import database
+from app.core.password_hasher import password_hasher
+from app.core.rate_limit import rate_limiter
+from app.core.user_cache import user_cache
+from app.main import app
+from app.models.base import Base
+from app.models.user import User
+from app.routers.auth import create_access_token, create_reset_token, issue_tokens
+
+SCENARIOS = ("register", "login", "refresh", "authenticated", "reset", "reset-password")
+PASSWORD = "LoadTest123"
+NEW_PASSWORD = "LoadTest456"
+
+async def seed_users(prefix: str, count: int) -> list:
+    """Insert ``count`` users directly, sharing one password hash"""
+    hashed_password = await password_hasher.hash(PASSWORD)
+    usernames = [f"{prefix}_{i}" for i in range(count)]
+    async with database.async_session() as db:
+        db.add_all([
+            User(username=username, email=f"{username}@example.com", hashed_password=hashed_password)
+            for username in usernames
+        ])
+        await db.commit()
+    return usernames
+
+async def seed_refresh_tokens(usernames: list, count: int) -> list:
+    """``count`` refresh tokens spread over the seeded users; each is used once"""
+    async with database.async_session() as db:
+        result = await db.execute(select(User).where(User.username.in_(usernames)))
+        users = result.scalars().all()
+        tokens = [issue_tokens(db, users[i % len(users)])["refresh_token"] for i in range(count)]
+        await db.commit()
+    return tokens
+
+def reset_tokens(usernames: list) -> list:
+    """One reset token per user: a reset revokes the user's tokens, so each
+    link works once"""
+    return [create_reset_token({"sub": f"{username}@example.com", "ver": 0}) for username in usernames]
+
+def build_requests(scenario: str, prefix: str, usernames: list, tokens: list, refresh_tokens: list, resets: list):
+    """Returns ``i -> (method, url, request kwargs)`` for the scenario"""
+    if scenario == "register":
+        return lambda i: ("POST", "/auth/register", {"json": {
+            "username": f"{prefix}_new_{i}",
+            "email": f"{prefix}_new_{i}@example.com",
+            "password": PASSWORD,
+        }})
+    if scenario == "login":
+        return lambda i: ("POST", "/auth/login", {"json": {
+            "username": usernames[i % len(usernames)],
+            "password": PASSWORD,
+        }})
+    if scenario == "refresh":
+        return lambda i: ("POST", "/auth/refresh", {"json": {"refresh_token": refresh_tokens[i]}})
+    if scenario == "authenticated":
+        return lambda i: ("GET", "/devices", {
+            "params": {"limit": 1},
+            "headers": {"Authorization": f"Bearer {tokens[i % len(tokens)]}"},
+        })
+    if scenario == "reset":
+        return lambda i: ("POST", "/auth/request-password-reset", {"json": {
+            "email": f"{usernames[i % len(usernames)]}@example.com",
+        }})
+    # The form post runs the password policy, a hash and the token revocation
+    return lambda i: ("POST", "/auth/reset-password", {"data": {
+        "token": resets[i],
+        "new_password": NEW_PASSWORD,
+    }})
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    # Nearest-rank, so the figure is always a latency that was observed
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def run_scenario(client: httpx.AsyncClient, build_request, requests: int, concurrency: int) -> dict:
+    latencies = []
+    statuses = Counter()
+    indexes = iter(range(requests))
+
+    async def client_loop():
+        # One shared iterator: each simulated client takes the next request
+        for i in indexes:
+            method, url, kwargs = build_request(i)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": sum(count for status_code, count in statuses.items() if status_code >= 400),
+        "status_counts": {str(status_code): count for status_code, count in sorted(statuses.items())},
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(requests / elapsed, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def main(scenarios: list, requests: int, concurrency: int, users: int) -> dict:
+    rate_limiter.enabled = False
+    async with database.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await database.warm_pool(concurrency)
+
+    prefix = f"load_{uuid.uuid4().hex[:8]}"
+    usernames = await seed_users(prefix, users)
+    tokens = [create_access_token({"sub": username}) for username in usernames]
+    refresh_tokens = await seed_refresh_tokens(usernames, requests) if "refresh" in scenarios else []
+    resets = reset_tokens(await seed_users(f"{prefix}_reset", requests)) if "reset-password" in scenarios else []
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": database.dialect_name,
+            "python": platform.python_version(),
+            "requests": requests,
+            "concurrency": concurrency,
+            "users": users,
+            "password_hash_workers": password_hasher.workers,
+        },
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for scenario in scenarios:
+            # Every scenario starts with cold caches, as after a deploy
+            user_cache.clear()
+            build_request = build_requests(scenario, prefix, usernames, tokens, refresh_tokens, resets)
+            result = await run_scenario(client, build_request, requests, concurrency)
+            results["scenarios"][scenario] = result
+            print(
+                f"{scenario:>14}: {result['throughput_rps']:9.1f} req/s  "
+                f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+                f"p99 {result['p99_ms']:8.1f} ms  errors {result['errors']}"
+            )
+
+    password_hasher.shutdown()
+    await database.dispose_engine()
+    return results
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Print the change per scenario; returns False when any scenario regressed"""
+    ok = True
+    print(f"\nvs {baseline['meta']['commit']} ({baseline['meta']['timestamp']}), threshold {threshold:.0%}")
+    print(f"{'scenario':>14} " + " ".join(f"{label:^25}" for label in ("req/s", "p50 ms", "p95 ms", "p99 ms")))
+    for scenario, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(scenario)
+        if before is None:
+            continue
+        cells = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            change = (result[key] - before[key]) / before[key] if before[key] else 0.0
+            cells.append(f"{before[key]:>8.1f} -> {result[key]:<8.1f} {change:>+5.0%}")
+        throughput_drop = (before["throughput_rps"] - result["throughput_rps"]) / before["throughput_rps"]
+        p95_rise = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        regressed = throughput_drop > threshold or p95_rise > threshold
+        ok = ok and not regressed
+        print(f"{scenario:>14} " + " ".join(cells) + ("  REGRESSED" if regressed else ""))
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=100, help="Existing users the login, refresh, authenticated and reset scenarios cycle through; reset-password seeds one per request")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare with a results file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed regression in p95 latency or throughput")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(main(scenarios, args.requests, args.concurrency, args.users))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(baseline, results, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,56 @@
+"""Deliver queued outbox emails through the stand-in SMTP server.
+
+Creates the schema in DATABASE_URL, queues ``--emails`` reset emails,
+drains the outbox and reports throughput and how many SMTP connections
+were opened. Point DATABASE_URL at a scratch database, e.g.
+
+    SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_TLS=false \\
+    DATABASE_URL=sqlite+aiosqlite:///outbox-bench.db python -m benchmarks.email_outbox
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.database import async_session, engine
+from app.core.email_outbox import enqueue_email, outbox_worker
+from app.core.email_service import smtp_pool
+from app.models.base import Base
+from benchmarks.smtp_stub import SMTPStub
+
+async def main(emails: int, smtp_delay: float) -> None:
+    stub = SMTPStub(delay=smtp_delay)
+    await stub.start(settings.SMTP_HOST, settings.SMTP_PORT)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session() as db:
+        for i in range(emails):
+            enqueue_email(
+                db,
+                email_to=f"user{i}@example.com",
+                subject="Reset Your Password",
+                template_name="reset_password",
+                template_data={"reset_url": f"http://localhost/reset?token={i}", "expiration_minutes": 30}
+            )
+        await db.commit()
+
+    start = time.perf_counter()
+    while await outbox_worker.process_batch():
+        pass
+    elapsed = time.perf_counter() - start
+
+    await smtp_pool.close()
+    await stub.stop()
+    await engine.dispose()
+
+    print(f"emails sent:      {outbox_worker.sent} ({outbox_worker.failed} failed)")
+    print(f"elapsed:          {elapsed:.2f}s ({outbox_worker.sent / elapsed:.0f} emails/s)")
+    print(f"SMTP connections: {stub.connections} (pool size {smtp_pool.size})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--smtp-delay", type=float, default=0.0, help="simulated server latency per message")
+    args = parser.parse_args()
+    asyncio.run(main(args.emails, args.smtp_delay))
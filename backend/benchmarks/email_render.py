@@ -0,0 +1,56 @@
+"""Messages rendered per second by the email service.
+
+``baseline`` repeats what send_email used to do for every message (template
+lookup, render, fresh MIME parts); ``batch`` uses build_messages. Both
+render the reset template with per-recipient data (``--unique``) or with
+one shared body, as a bulk notification would.
+
+    python -m benchmarks.email_render --messages 5000
+"""
+import argparse
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from app.core.config import settings
+from app.core.email_service import build_messages, get_environment, warm_templates
+
+def baseline(recipients):
+    for email_to, template_data in recipients:
+        message = MIMEMultipart()
+        message["From"] = f"{settings.EMAILS_FROM_NAME} <{settings.EMAILS_FROM_EMAIL}>"
+        message["To"] = email_to
+        message["Subject"] = "Reset Your Password"
+        html_content = get_environment().get_template("reset_password.html").render(**template_data)
+        message.attach(MIMEText(html_content, "html"))
+
+def batch(recipients):
+    build_messages("Reset Your Password", "reset_password", recipients)
+
+def main(messages: int, unique: bool) -> None:
+    start = time.perf_counter()
+    warm_templates()
+    print(f"template warm-up: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    recipients = [
+        (
+            f"user{i}@example.com",
+            {
+                "reset_url": f"http://localhost/auth/reset-password?token={i if unique else 'shared'}",
+                "expiration_minutes": 30,
+            },
+        )
+        for i in range(messages)
+    ]
+    for name, func in (("baseline", baseline), ("batch", batch)):
+        start = time.perf_counter()
+        func(recipients)
+        elapsed = time.perf_counter() - start
+        print(f"{name:9s} {messages / elapsed:10.0f} messages/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--unique", action=argparse.BooleanOptionalAction, default=True)
+    args = parser.parse_args()
+    main(args.messages, args.unique)
@@ -0,0 +1,54 @@
+"""Cost of a rate-limit check compared with the password verify it protects.
+
+Times ``RateLimiter.hit`` on the in-memory and shared SQLite backends, with
+a working set larger than ``max_keys`` so eviction is exercised, next to one
+``password_hasher.verify``. Memory use is reported as the number of keys
+held after the run.
+
+    python -m benchmarks.rate_limit --checks 200000 --clients 500000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.core.password_hasher import password_hasher
+from app.core.rate_limit import MemoryRateLimitBackend, SqliteRateLimitBackend, RateLimiter, Rule
+
+RULE = Rule("bench", 5, 60)
+
+async def time_backend(backend, checks: int, clients: int) -> None:
+    limiter = RateLimiter(backend)
+    start = time.perf_counter()
+    for i in range(checks):
+        await limiter.hit(RULE, f"10.{i % clients // 65536}.{i % clients // 256 % 256}.{i % 256}")
+    elapsed = time.perf_counter() - start
+    stats = limiter.stats()
+    print(
+        f"{type(backend).__name__:>24}: {elapsed / checks * 1e6:8.2f} us/check, "
+        f"{stats['keys']} keys held, {sum(stats['rejected'].values())} rejected"
+    )
+
+async def time_verify(rounds: int) -> None:
+    hashed = await password_hasher.hash("Benchmark123")
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await password_hasher.verify("Benchmark123", hashed)
+    elapsed = time.perf_counter() - start
+    print(f"{'password verify':>24}: {elapsed / rounds * 1e6:8.0f} us/call")
+    password_hasher.shutdown()
+
+async def main(checks: int, clients: int, max_keys: int) -> None:
+    await time_backend(MemoryRateLimitBackend(max_keys), checks, clients)
+    with tempfile.TemporaryDirectory() as directory:
+        await time_backend(SqliteRateLimitBackend(os.path.join(directory, "rate_limit.sqlite3"), max_keys), checks // 10, clients)
+    await time_verify(20)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checks", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=500_000, help="Distinct client keys cycled through")
+    parser.add_argument("--max-keys", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.checks, args.clients, args.max_keys))
@@ -0,0 +1,94 @@
+"""Response objects serialized per second, FastAPI's default path vs the fast one.
+
+``default`` is what FastAPI does for a route with a ``response_model``:
+validate the return value, ``dump_python`` it to JSON-compatible objects
+and encode those with the stdlib ``json`` module in ``JSONResponse``.
+``fast`` is ``serialized_response`` (one pydantic-core validate and dump to
+bytes), or for routes that return plain dicts the same FastAPI path ending
+in ``ORJSONResponse``. Each case builds the same body from the
+same objects: a page of device rows as the ORM returns them, a usage
+series, and a login ``Token``.
+
+    python -m benchmarks.serialization --page 100 --rounds 2000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.serialization import serialized_response
+from app.models.device import Device
+from app.schemas.device import DevicePage
+from app.schemas.usage import UsageSeries
+from app.schemas.user import Token
+
+def device_page(size: int) -> dict:
+    now = datetime(2026, 1, 1)
+    devices = [
+        Device(
+            id=i, user_id=1, device_uid=f"device-{i:06d}", name=f"Sensor {i}",
+            device_type="sensor", firmware_version="1.4.2", status="active",
+            attributes={"rack": i % 40, "zone": "eu-west"},
+            last_seen=now, created_at=now, updated_at=now
+        )
+        for i in range(size)
+    ]
+    return {"items": devices, "next_after": size}
+
+def usage_series(size: int) -> dict:
+    start = datetime(2026, 1, 1)
+    return {
+        "metric": "cpu_seconds",
+        "interval": "minute",
+        "buckets": [
+            {"bucket_start": start + timedelta(minutes=i), "count": 60, "total": i * 1.5, "min": 0.1, "max": 9.9}
+            for i in range(size)
+        ],
+    }
+
+def token() -> dict:
+    return {"access_token": "a" * 180, "refresh_token": "r" * 220, "token_type": "bearer", "expires_in": 1800}
+
+async def default_path(field, data, response_class=JSONResponse) -> bytes:
+    content = await serialize_response(field=field, response_content=data)
+    return response_class(content).body
+
+def timed(rounds: int, objects: int, func) -> float:
+    """Objects per second; ``func`` is called ``rounds`` times"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return rounds * objects / (time.perf_counter() - start)
+
+def main(page: int, rounds: int) -> None:
+    cases = (
+        ("device page", DevicePage, device_page(page), page),
+        ("usage series", UsageSeries, usage_series(page), page),
+        ("token", Token, token(), 1),
+    )
+    loop = asyncio.new_event_loop()
+    for name, type_, data, objects in cases:
+        # FastAPI builds the field once per route
+        field = create_response_field(name="Response", type_=type_)
+        # Same content either way; the stdlib adds spaces after separators
+        assert len(serialized_response(type_, data).body) <= len(loop.run_until_complete(default_path(field, data)))
+        default = timed(rounds, objects, lambda: loop.run_until_complete(default_path(field, data)))
+        if type_ is Token:
+            # Routes returning plain dicts keep FastAPI's validation and only
+            # swap the response class
+            fast = timed(rounds, objects, lambda: loop.run_until_complete(default_path(field, data, ORJSONResponse)))
+        else:
+            fast = timed(rounds, objects, lambda: serialized_response(type_, data).body)
+        print(f"{name:>13}: default {default:10.0f} objects/s   fast {fast:10.0f} objects/s   {fast / default:4.1f}x")
+    loop.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page", type=int, default=100, help="Rows per device page and buckets per series")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.page, args.rounds)
@@ -0,0 +1,85 @@
+"""Minimal stand-in SMTP server for exercising the email outbox locally.
+
+Accepts any sender/recipient without TLS or AUTH and discards the message,
+counting connections and messages so connection reuse is visible.
+
+    python -m benchmarks.smtp_stub --port 1025
+    SMTP_HOST=localhost SMTP_PORT=1025 SMTP_TLS=false uvicorn app.main:app
+"""
+import argparse
+import asyncio
+
+class SMTPStub:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.connections = 0
+        self.messages = 0
+        self._server = None
+        self._writers = set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            await self._converse(reader, writer)
+        except (asyncio.CancelledError, asyncio.IncompleteReadError, ConnectionError):
+            # The client hung up, or the stub is stopping with the connection open
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _converse(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(b"220 localhost stub ESMTP\r\n")
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line[:4].upper()
+            if command == b"EHLO":
+                writer.write(b"250-localhost\r\n250 8BITMIME\r\n")
+            elif command == b"DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                await reader.readuntil(b"\r\n.\r\n")
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                self.messages += 1
+                writer.write(b"250 OK queued\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 1025) -> int:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        # Connections still open (pooled clients) would keep wait_closed waiting
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+
+async def main(host: str, port: int) -> None:
+    stub = SMTPStub()
+    port = await stub.start(host, port)
+    print(f"SMTP stub listening on {host}:{port}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(f"connections={stub.connections} messages={stub.messages}")
+    finally:
+        await stub.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))
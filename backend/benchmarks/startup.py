@@ -0,0 +1,96 @@
+"""Cold-start import cost of the application, with a regression gate for CI.
+
+Imports ``--module`` (``app.main`` by default) in fresh interpreters and
+reports the wall time, plus a ``-X importtime`` breakdown of the slowest
+top-level packages. With ``--max-ms`` it exits non-zero when the fastest
+run exceeds the budget, so CI can fail on startup regressions; the
+fastest run is the one least disturbed by other load on the machine.
+
+    python -m benchmarks.startup --runs 5 --max-ms 1500
+    python -m benchmarks.startup --module app.cli --top 15
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# Loaded on first use (see app.core.email_service, password_hasher, tokens
+# and database); importing the app must not pull them in
+LAZY_MODULES = ("jinja2", "aiosmtplib", "passlib", "jose.jwk", "aiomysql", "aiosqlite")
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    # Keep logging setup and SQL echo out of the measurement
+    env.setdefault("ENVIRONMENT", "production")
+    env.setdefault("LOG_ASYNC", "false")
+    return env
+
+def cold_import(module: str) -> tuple:
+    """Seconds a fresh interpreter spends importing ``module``, and which of
+    ``LAZY_MODULES`` that loaded"""
+    code = (
+        "import sys, time; start = time.perf_counter(); "
+        f"import {module}; elapsed = time.perf_counter() - start; "
+        f"print(elapsed, *[name for name in {LAZY_MODULES!r} if name in sys.modules])"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True, capture_output=True, text=True, env=child_env()
+    ).stdout
+    elapsed, *loaded = output.strip().splitlines()[-1].split()
+    return float(elapsed), loaded
+
+def import_breakdown(module: str) -> dict:
+    """Cumulative microseconds per top-level package, as first imported"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True, capture_output=True, text=True, env=child_env()
+    ).stderr
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        self_us, _, indent, name = match.groups()
+        # Self time summed per top-level package; cumulative times would
+        # charge a package for everything it happens to import first
+        totals[name.split(".")[0]] += int(self_us)
+    return totals
+
+def main(module: str, runs: int, top: int, max_ms: float) -> int:
+    timings = []
+    for _ in range(runs):
+        elapsed, loaded = cold_import(module)
+        timings.append(elapsed * 1000)
+    best = min(timings)
+    print(f"import {module}: best {best:.0f} ms, median {statistics.median(timings):.0f} ms over {runs} runs")
+
+    if top:
+        totals = import_breakdown(module)
+        print(f"\n{'package':<24} {'ms':>8}")
+        for name, micros in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]:
+            print(f"{name:<24} {micros / 1000:>8.1f}")
+
+    failed = False
+    if loaded:
+        print(f"\nFAIL: imported eagerly: {', '.join(loaded)}")
+        failed = True
+    if max_ms and best > max_ms:
+        print(f"\nFAIL: best run {best:.0f} ms is over the {max_ms:.0f} ms budget")
+        failed = True
+    return int(failed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="Packages to list in the breakdown, 0 to skip it")
+    parser.add_argument("--max-ms", type=float, default=0, help="Fail when the fastest import exceeds this")
+    args = parser.parse_args()
+    sys.exit(main(args.module, args.runs, args.top, args.max_ms))
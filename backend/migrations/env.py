@@ -0,0 +1,45 @@
+"""Alembic environment.
+
+``python -m app.cli migrate`` hands over a connection from the app's engine
+in ``config.attributes["connection"]``; the ``alembic`` command line gets an
+engine of its own for DATABASE_URL.
+"""
+import asyncio
+
+from alembic import context
+
+from app.core import database
+from app.core.logger import setup_logging
+from app.models.base import Base
+# Imported so their tables are registered on Base.metadata for autogenerate
+from app.models import device, email_outbox, refresh_token, usage, user  # noqa: F401
+
+config = context.config
+target_metadata = Base.metadata
+
+def run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_type=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+async def run_online() -> None:
+    engine = database.get_engine()
+    try:
+        async with engine.connect() as conn:
+            await conn.run_sync(run_migrations)
+    finally:
+        await engine.dispose()
+
+if context.is_offline_mode():
+    raise SystemExit("Offline (--sql) migrations are not supported; run against a database")
+
+connection = config.attributes.get("connection")
+if connection is not None:
+    run_migrations(connection)
+else:
+    setup_logging()
+    asyncio.run(run_online())
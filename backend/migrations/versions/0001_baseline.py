@@ -0,0 +1,142 @@
+"""Baseline: the schema as ``create_all`` built it before migrations
+
+Databases created earlier, by ``create_all`` or ``mysql-init/01-init.sql``,
+may have only some of these tables, and ``users`` without
+``token_version``. Existing tables are kept and completed with the columns
+and indexes they lack; missing ones are created.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.usage_partitions import partition_usage_records
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# FLOAT(53) is DOUBLE on MySQL; BIGINT ids auto-increment only as INTEGER on SQLite
+Double = sa.Float(precision=53)
+BigId = sa.BigInteger().with_variant(sa.Integer, "sqlite")
+
+def create_or_complete(name: str, *columns: sa.Column, indexes: tuple = ()) -> bool:
+    """Create the table, or add what an older copy lacks; returns whether
+    it was created. ``indexes`` are ``(name, columns, unique)``."""
+    inspector = sa.inspect(op.get_bind())
+    created = not inspector.has_table(name)
+    if created:
+        op.create_table(name, *columns)
+    else:
+        existing = {column["name"] for column in inspector.get_columns(name)}
+        for column in columns:
+            if not isinstance(column, sa.Column) or column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise RuntimeError(f"{name}.{column.name} is missing and has no default for existing rows; add it by hand")
+            op.add_column(name, column)
+    # An older index on the same columns counts, whatever its name
+    indexed = [] if created else [index["column_names"] for index in inspector.get_indexes(name)]
+    for index_name, index_columns, unique in indexes:
+        if index_columns not in indexed:
+            op.create_index(index_name, name, index_columns, unique=unique)
+    return created
+
+def rollup_table(name: str) -> None:
+    create_or_complete(
+        name,
+        sa.Column("user_id", sa.Integer, primary_key=True),
+        sa.Column("metric", sa.String(50), primary_key=True),
+        sa.Column("bucket_start", sa.DateTime, primary_key=True),
+        sa.Column("device_id", sa.Integer, primary_key=True),
+        sa.Column("count", sa.BigInteger, nullable=False),
+        sa.Column("total", Double, nullable=False),
+        sa.Column("min_value", Double, nullable=False),
+        sa.Column("max_value", Double, nullable=False),
+        indexes=((f"ix_{name}_device", ["user_id", "device_id", "metric", "bucket_start"], False),)
+    )
+
+def upgrade() -> None:
+    create_or_complete(
+        "users",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("username", sa.String(50)),
+        sa.Column("email", sa.String(100)),
+        sa.Column("hashed_password", sa.String(200)),
+        sa.Column("token_version", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        indexes=(
+            ("ix_users_id", ["id"], False),
+            ("ix_users_username", ["username"], True),
+            ("ix_users_email", ["email"], True),
+        )
+    )
+
+    create_or_complete(
+        "devices",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("device_uid", sa.String(64), nullable=False),
+        sa.Column("name", sa.String(100)),
+        sa.Column("device_type", sa.String(50)),
+        sa.Column("firmware_version", sa.String(50)),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attributes", sa.JSON),
+        sa.Column("last_seen", sa.DateTime),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("user_id", "device_uid", name="uq_devices_user_device_uid"),
+        indexes=(("ix_devices_user_id_id", ["user_id", "id"], False),)
+    )
+
+    create_or_complete(
+        "refresh_tokens",
+        sa.Column("jti", sa.String(32), primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("expires_at", sa.DateTime, nullable=False),
+        sa.Column("used_at", sa.DateTime),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    create_or_complete(
+        "email_outbox",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("email_to", sa.String(100), nullable=False),
+        sa.Column("subject", sa.String(200), nullable=False),
+        sa.Column("template_name", sa.String(100), nullable=False),
+        sa.Column("template_data", sa.JSON, nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attempts", sa.Integer, nullable=False),
+        sa.Column("last_error", sa.String(500)),
+        sa.Column("next_attempt_at", sa.DateTime, nullable=False),
+        sa.Column("sent_at", sa.DateTime),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        indexes=(("ix_email_outbox_status_next_attempt", ["status", "next_attempt_at"], False),)
+    )
+
+    created = create_or_complete(
+        "usage_records",
+        sa.Column("id", BigId, primary_key=True),
+        sa.Column("user_id", sa.Integer, nullable=False),
+        sa.Column("device_id", sa.Integer),
+        sa.Column("metric", sa.String(50), nullable=False),
+        sa.Column("value", Double, nullable=False),
+        sa.Column("recorded_at", sa.DateTime, nullable=False),
+        indexes=(("ix_usage_records_user_metric_time", ["user_id", "metric", "recorded_at"], False),)
+    )
+    if created:
+        partition_usage_records(op.get_bind())
+
+    for name in ("usage_rollup_minute", "usage_rollup_hour", "usage_rollup_day"):
+        rollup_table(name)
+
+def downgrade() -> None:
+    for name in (
+        "usage_rollup_day", "usage_rollup_hour", "usage_rollup_minute",
+        "usage_records", "email_outbox", "refresh_tokens", "devices", "users",
+    ):
+        op.drop_table(name)
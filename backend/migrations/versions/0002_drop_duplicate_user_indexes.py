@@ -0,0 +1,48 @@
+"""Keep one unique index per users column
+
+``mysql-init/01-init.sql`` created ``users`` with UNIQUE keys plus
+``idx_username``/``idx_email`` on the same columns, and ``create_all`` added
+``ix_users_id`` next to the primary key. Every insert and update paid for
+the copies. Both kinds of database end up with ``uq_users_username`` and
+``uq_users_email`` only.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+UNIQUE_COLUMNS = ("username", "email")
+
+def indexes_on(column: str) -> list:
+    """Single-column indexes on ``users.column``. MySQL lists UNIQUE keys
+    here as well; SQLite only its named indexes."""
+    return [
+        index for index in sa.inspect(op.get_bind()).get_indexes("users")
+        if index["column_names"] == [column]
+    ]
+
+def upgrade() -> None:
+    for column in UNIQUE_COLUMNS:
+        name = f"uq_users_{column}"
+        existing = indexes_on(column)
+        if not any(index["name"] == name for index in existing):
+            op.create_index(name, "users", [column], unique=True)
+        for index in existing:
+            if index["name"] != name:
+                op.drop_index(index["name"], table_name="users")
+    # The primary key already indexes id
+    for index in indexes_on("id"):
+        op.drop_index(index["name"], table_name="users")
+
+def downgrade() -> None:
+    op.create_index("ix_users_id", "users", ["id"])
+    for column in UNIQUE_COLUMNS:
+        op.create_index(f"ix_users_{column}", "users", [column], unique=True)
+        op.drop_index(f"uq_users_{column}", table_name="users")
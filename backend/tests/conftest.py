@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+# Settings are read once at import, so the test environment is set before
+# anything from app is imported
+_scratch = tempfile.mkdtemp(prefix="msat-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite+aiosqlite:///{_scratch}/test.db",
+    ENVIRONMENT="test",
+    LOG_LEVEL="WARNING",
+    LOG_ASYNC="false",
+    PASSWORD_HASH_SCHEMES="bcrypt",
+    PASSWORD_BCRYPT_ROUNDS="4",
+    USER_CACHE_BACKEND="memory",
+    RATE_LIMIT_BACKEND="memory",
+    EMAIL_TEMPLATE_CACHE_DIR="",
+    EMAILS_FROM_EMAIL="noreply@example.com",
+    SMTP_USER="",
+    SMTP_PASSWORD="",
+    SMTP_TLS="false",
+    ADMIN_USERNAMES="admin",
+)
+
+import httpx
+import pytest
+
+from app.core import database
+from app.core.rate_limit import rate_limiter
+from app.core.tokens import access_token_cache
+from app.core.user_cache import user_cache
+from app.models.base import Base
+from app.models import device, email_outbox, refresh_token, usage, user  # noqa: F401  registers the tables
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def db_engine():
+    """Empty schema for one test. The engine is disposed afterwards, since
+    its pooled connections belong to the test's event loop."""
+    engine = database.engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await database.dispose_engine()
+    database._engine = None
+    database._async_session = None
+
+@pytest.fixture
+async def client(db_engine):
+    """The app over httpx's ASGI transport, with empty caches and rate limits.
+    The lifespan is not run, so no background workers start."""
+    from app.main import app
+
+    user_cache.clear()
+    access_token_cache.clear()
+    rate_limiter.backend.reset()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.core.database import session_scope
+from app.core.password_hasher import password_hasher
+from app.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+PASSWORD = "Secret123"
+
+@pytest.fixture
+async def admin_headers(client) -> dict:
+    response = await client.post("/auth/register", json={
+        "username": "admin", "email": "admin@example.com", "password": PASSWORD,
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def user_count() -> int:
+    async with session_scope() as db:
+        return (await db.execute(select(func.count()).select_from(User))).scalar_one()
+
+async def test_import_report(client, admin_headers):
+    legacy_hash = await password_hasher.hash("Legacy123")
+    rows = [
+        {"username": "carol", "email": "carol@example.com", "password": PASSWORD},
+        {"username": "dave", "email": "dave@example.com", "hashed_password": legacy_hash},
+        {"username": "eve", "email": "not-an-email", "password": PASSWORD},
+        {"username": "Carol", "email": "carol2@example.com", "password": PASSWORD},
+        {"username": "admin", "email": "other@example.com", "password": PASSWORD},
+        {"username": "frank", "email": "frank@example.com", "password": "short"},
+        {"username": "grace", "email": "grace@example.com"},
+    ]
+    response = await client.post("/admin/users/bulk", json=rows, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["received"], result["created"]) == (7, 2)
+    assert [(row["row"], row["status"]) for row in result["rows"]] == [
+        (1, "created"), (2, "created"), (3, "invalid"), (4, "duplicate"),
+        (5, "exists"), (6, "invalid"), (7, "invalid"),
+    ]
+    assert result["rows"][2]["detail"].startswith("email:")
+    assert await user_count() == 3
+
+    for username, password in (("carol", PASSWORD), ("dave", "Legacy123")):
+        response = await client.post("/auth/login", json={"username": username, "password": password})
+        assert response.status_code == 200
+
+async def test_dry_run_creates_nobody(client, admin_headers):
+    csv_body = "username,email,password\nheidi,heidi@example.com,Secret123\nivan,ivan@example.com,\n"
+    response = await client.post(
+        "/admin/users/bulk", params={"dry_run": True}, content=csv_body,
+        headers={**admin_headers, "Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["created"] == 0
+    assert [row["status"] for row in result["rows"]] == ["valid", "invalid"]
+    assert await user_count() == 1
+
+async def test_requires_admin(client, admin_headers):
+    response = await client.post("/auth/register", json={
+        "username": "mallory", "email": "mallory@example.com", "password": PASSWORD,
+    })
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = await client.post("/admin/users/bulk", json=[], headers=headers)
+    assert response.status_code == 403
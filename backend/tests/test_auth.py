@@ -0,0 +1,154 @@
+import pytest
+from sqlalchemy.future import select
+
+from app.core.database import session_scope
+from app.core.password_hasher import password_hasher
+from app.models.refresh_token import RefreshToken
+from app.core.rate_limit import LOGIN_PER_USERNAME
+from app.models.user import User
+from app.routers.auth import create_reset_token, revoke_all_tokens
+
+pytestmark = pytest.mark.anyio
+
+PASSWORD = "Secret123"
+
+async def register(client, username: str = "alice") -> dict:
+    response = await client.post("/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": PASSWORD,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+async def me(client, tokens: dict):
+    """Any authenticated request"""
+    return await client.get("/devices", params={"limit": 1}, headers={"Authorization": f"Bearer {tokens['access_token']}"})
+
+async def token_version(username: str) -> int:
+    async with session_scope() as db:
+        return (await db.execute(select(User.token_version).where(User.username == username))).scalar_one()
+
+async def test_login_issues_working_tokens(client):
+    await register(client)
+    response = await client.post("/auth/login", json={"username": "alice", "password": PASSWORD})
+    assert response.status_code == 200
+    tokens = response.json()
+    assert tokens["refresh_token"] and tokens["expires_in"] > 0
+    assert (await me(client, tokens)).status_code == 200
+
+    response = await client.post("/auth/login", json={"username": "alice", "password": "Wrong1234"})
+    assert response.status_code == 401
+
+async def test_refresh_rotates_the_refresh_token(client):
+    tokens = await register(client)
+    response = await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert (await me(client, rotated)).status_code == 200
+
+    async with session_scope() as db:
+        rows = (await db.execute(select(RefreshToken).order_by(RefreshToken.created_at))).scalars().all()
+    assert len(rows) == 2
+    assert sum(row.used_at is not None for row in rows) == 1
+
+async def test_refresh_token_reuse_revokes_every_session(client):
+    tokens = await register(client)
+    rotated = (await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})).json()
+
+    response = await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+    assert await token_version("alice") == 1
+    # The legitimate client's newer tokens die with the stolen one
+    assert (await me(client, rotated)).status_code == 401
+    response = await client.post("/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert response.status_code == 401
+
+async def test_refresh_rejects_access_tokens(client):
+    tokens = await register(client)
+    response = await client.post("/auth/refresh", json={"refresh_token": tokens["access_token"]})
+    assert response.status_code == 401
+
+async def test_logout_revokes_one_refresh_token(client):
+    tokens = await register(client)
+    other = (await client.post("/auth/login", json={"username": "alice", "password": PASSWORD})).json()
+
+    response = await client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    assert (await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 401
+    # A missing row is a logout, not a theft: other sessions keep working
+    assert await token_version("alice") == 0
+    assert (await client.post("/auth/refresh", json={"refresh_token": other["refresh_token"]})).status_code == 200
+
+async def test_logout_all_sessions(client):
+    tokens = await register(client)
+    other = (await client.post("/auth/login", json={"username": "alice", "password": PASSWORD})).json()
+    assert (await me(client, other)).status_code == 200
+
+    response = await client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"], "all_sessions": True})
+    assert response.status_code == 200
+    assert (await me(client, other)).status_code == 401
+    assert (await client.post("/auth/refresh", json={"refresh_token": other["refresh_token"]})).status_code == 401
+    # Logging out again with a revoked token is not an error
+    response = await client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+
+async def test_revoke_all_tokens_bumps_the_version(db_engine):
+    async with session_scope() as db:
+        user = User(username="bob", email="bob@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        assert await revoke_all_tokens(db, user) == 1
+        assert await revoke_all_tokens(db, user) == 2
+        await db.commit()
+    assert await token_version("bob") == 2
+
+async def test_change_password_revokes_older_tokens(client):
+    tokens = await register(client)
+    response = await client.post(
+        "/auth/change-password",
+        json={"current_password": PASSWORD, "new_password": "Changed123"},
+        headers={"Authorization": f"Bearer {tokens['access_token']}"}
+    )
+    assert response.status_code == 200
+    assert (await me(client, tokens)).status_code == 401
+    assert (await me(client, response.json())).status_code == 200
+
+async def test_reset_link_works_once(client):
+    await register(client)
+    token = create_reset_token({"sub": "alice@example.com", "ver": 0})
+    form = {"token": token, "new_password": "Reset1234"}
+
+    assert (await client.post("/auth/reset-password", data=form)).status_code == 200
+    assert (await client.post("/auth/reset-password", data=form)).status_code == 400
+    response = await client.post("/auth/login", json={"username": "alice", "password": "Reset1234"})
+    assert response.status_code == 200
+
+async def test_only_failed_logins_use_up_the_username_limit(client):
+    await register(client)
+    limit = LOGIN_PER_USERNAME.limit
+    # Stays under the per-IP limit, which is not under test
+    for _ in range(limit + 2):
+        response = await client.post("/auth/login", json={"username": "alice", "password": PASSWORD})
+        assert response.status_code == 200
+
+    for _ in range(limit):
+        response = await client.post("/auth/login", json={"username": "Alice", "password": "Wrong1234"})
+        assert response.status_code == 401
+    response = await client.post("/auth/login", json={"username": "alice", "password": PASSWORD})
+    assert response.status_code == 429
+
+async def test_short_legacy_password_still_logs_in(client):
+    # Set before the policy's minimum length applied
+    async with session_scope() as db:
+        db.add(User(username="legacy", email="legacy@example.com", hashed_password=await password_hasher.hash("abc1")))
+        await db.commit()
+    response = await client.post("/auth/login", json={"username": "legacy", "password": "abc1"})
+    assert response.status_code == 200
+    response = await client.post(
+        "/auth/change-password",
+        json={"current_password": "abc1", "new_password": "Longer123"},
+        headers={"Authorization": f"Bearer {response.json()['access_token']}"}
+    )
+    assert response.status_code == 200
@@ -0,0 +1,156 @@
+import asyncio
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app.core import email_service
+from app.core.config import settings
+from app.core.database import session_scope
+from app.core.email_outbox import OutboxWorker, enqueue_email
+from app.core.email_service import SMTPConnectionPool, send_email
+from app.models.email_outbox import EmailOutbox
+from benchmarks.smtp_stub import SMTPStub
+
+pytestmark = pytest.mark.anyio
+
+def closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+async def smtp(monkeypatch):
+    """Stand-in SMTP server, with a fresh pool pointed at it"""
+    stub = SMTPStub()
+    port = await stub.start("127.0.0.1", 0)
+    pool = SMTPConnectionPool(size=2, idle_timeout=60)
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", port)
+    monkeypatch.setattr(email_service, "smtp_pool", pool)
+    yield stub
+    await pool.close()
+    await stub.stop()
+
+def make_worker(**overrides) -> OutboxWorker:
+    options = dict(batch_size=10, poll_interval=1, max_attempts=3, retry_base=60, retry_max=600, claim_timeout=300)
+    options.update(overrides)
+    return OutboxWorker(**options)
+
+async def enqueue(count: int) -> None:
+    async with session_scope() as db:
+        for i in range(count):
+            enqueue_email(db, f"user{i}@example.com", "Reset Your Password", "reset_password",
+                          {"reset_url": f"http://localhost/reset?token={i}", "expiration_minutes": 30})
+        await db.commit()
+
+async def outbox_rows() -> list:
+    async with session_scope() as db:
+        return list((await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars())
+
+async def make_due() -> None:
+    async with session_scope() as db:
+        await db.execute(update(EmailOutbox).values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+        await db.commit()
+
+async def test_delivers_pending_emails(db_engine, smtp):
+    await enqueue(3)
+    worker = make_worker()
+
+    assert await worker.process_batch() == 3
+    assert await worker.process_batch() == 0
+    assert smtp.messages == 3
+    assert smtp.connections <= 2
+    for row in await outbox_rows():
+        assert row.status == "sent"
+        assert row.attempts == 1
+        assert row.sent_at is not None
+        # Reset links are not kept once delivered
+        assert row.template_data == {}
+
+async def test_claimed_rows_are_not_claimed_again(db_engine, smtp):
+    await enqueue(2)
+    worker = make_worker()
+
+    claimed = await worker._claim()
+    assert len(claimed) == 2
+    # Another worker polling during the send finds nothing due
+    assert await make_worker().process_batch() == 0
+
+async def test_failed_send_is_retried_with_backoff(db_engine, smtp, monkeypatch):
+    await enqueue(1)
+    worker = make_worker(retry_base=60)
+    monkeypatch.setattr(settings, "SMTP_PORT", closed_port())
+
+    before = datetime.utcnow()
+    assert await worker.process_batch() == 1
+    [row] = await outbox_rows()
+    assert row.status == "pending"
+    assert row.attempts == 1
+    assert row.last_error
+    assert before + timedelta(seconds=59) <= row.next_attempt_at <= datetime.utcnow() + timedelta(seconds=61)
+    # Not due again until the backoff has passed
+    assert await worker.process_batch() == 0
+
+    monkeypatch.setattr(settings, "SMTP_PORT", smtp._server.sockets[0].getsockname()[1])
+    await make_due()
+    assert await worker.process_batch() == 1
+    [row] = await outbox_rows()
+    assert row.status == "sent"
+    assert row.attempts == 2
+    assert worker.sent == 1
+
+async def test_gives_up_after_max_attempts(db_engine, smtp, monkeypatch):
+    await enqueue(1)
+    worker = make_worker(max_attempts=2)
+    monkeypatch.setattr(settings, "SMTP_PORT", closed_port())
+
+    assert await worker.process_batch() == 1
+    await make_due()
+    assert await worker.process_batch() == 1
+    [row] = await outbox_rows()
+    assert row.status == "failed"
+    assert row.attempts == 2
+    assert row.template_data == {}
+    assert worker.failed == 1
+
+    await make_due()
+    assert await worker.process_batch() == 0
+
+def test_retry_delay_doubles_up_to_the_maximum():
+    worker = make_worker(retry_base=10, retry_max=60)
+    assert [worker._retry_delay(attempts).total_seconds() for attempts in range(1, 6)] == [10, 20, 40, 60, 60]
+
+async def test_cancelled_send_closes_its_connection(smtp):
+    smtp.delay = 5
+    pool = email_service.smtp_pool
+    pool.size = 1
+    opened = []
+    connect = pool._connect
+
+    async def recording_connect():
+        opened.append(await connect())
+        return opened[-1]
+
+    pool._connect = recording_connect
+    task = asyncio.create_task(send_email("user@example.com", "Hello", "reset_password",
+                                          {"reset_url": "http://localhost/reset", "expiration_minutes": 30}))
+    while smtp.connections == 0:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert email_service.smtp_pool._idle == []
+    assert not opened[0].is_connected
+    # The pool slot was released, so the next send gets a new connection
+    smtp.delay = 0
+    await asyncio.wait_for(
+        send_email("user@example.com", "Hello", "reset_password",
+                   {"reset_url": "http://localhost/reset", "expiration_minutes": 30}),
+        timeout=5
+    )
+    assert smtp.connections == 2
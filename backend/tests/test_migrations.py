@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import inspect, text
+
+from app.cli import upgrade_schema
+from app.core import database
+from app.models.base import Base
+
+pytestmark = pytest.mark.anyio
+
+# users as create_all built it before migrations: no token_version, and an
+# index on the primary key
+LEGACY_SCHEMA = (
+    "CREATE TABLE users (id INTEGER NOT NULL PRIMARY KEY, username VARCHAR(50), email VARCHAR(100), "
+    "hashed_password VARCHAR(200), created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME)",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX ix_users_username ON users (username)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "INSERT INTO users (username, email, hashed_password) VALUES ('alice', 'alice@example.com', 'x')",
+)
+
+@pytest.fixture
+async def empty_db():
+    engine = database.engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    yield engine
+    await database.dispose_engine()
+    database._engine = None
+    database._async_session = None
+
+def schema(connection) -> dict:
+    inspector = inspect(connection)
+    return {
+        "tables": set(inspector.get_table_names()),
+        "user_columns": {column["name"] for column in inspector.get_columns("users")},
+        "user_indexes": {index["name"]: index["column_names"] for index in inspector.get_indexes("users")},
+        "revision": connection.execute(text("SELECT version_num FROM alembic_version")).scalar_one(),
+    }
+
+async def migrate(engine) -> dict:
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+    async with engine.connect() as conn:
+        return await conn.run_sync(schema)
+
+EXPECTED_USER_INDEXES = {"uq_users_username": ["username"], "uq_users_email": ["email"]}
+
+async def test_fresh_database(empty_db):
+    result = await migrate(empty_db)
+    assert set(Base.metadata.tables) <= result["tables"]
+    assert "token_version" in result["user_columns"]
+    assert result["user_indexes"] == EXPECTED_USER_INDEXES
+    assert result["revision"] == "0002"
+
+async def test_pre_migration_database(empty_db):
+    async with empty_db.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            await conn.execute(text(statement))
+
+    result = await migrate(empty_db)
+    assert set(Base.metadata.tables) <= result["tables"]
+    assert "token_version" in result["user_columns"]
+    assert result["user_indexes"] == EXPECTED_USER_INDEXES
+    assert result["revision"] == "0002"
+    async with empty_db.connect() as conn:
+        row = (await conn.execute(text("SELECT username, token_version FROM users"))).one()
+    assert tuple(row) == ("alice", 0)
+
+    # Running again finds nothing to do
+    assert await migrate(empty_db) == result
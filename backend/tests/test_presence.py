@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from app.core.presence import PresenceFull, PresenceTracker
+
+def full_tracker(offline: int, online: int) -> PresenceTracker:
+    """A tracker at capacity, its ``offline`` devices last seen long ago
+    and already stored"""
+    tracker = PresenceTracker(max_devices=offline + online, flush_interval=5, flush_size=100, offline_after=90)
+    now = time.time()
+    tracker.track(range(1, offline + 1), user_id=1, now=now - 1000)
+    tracker.track(range(offline + 1, offline + online + 1), user_id=1, now=now)
+    tracker._dirty.clear()
+    return tracker
+
+def test_full_tracker_reuses_offline_slots():
+    tracker = full_tracker(offline=3, online=2)
+    tracker.track([100, 101, 102], user_id=2, now=time.time())
+    assert len(tracker) == 5
+    assert tracker.last_seen(1, 1) is None
+    assert tracker.last_seen(100, 2) is not None
+    with pytest.raises(PresenceFull):
+        tracker.track([103], user_id=2, now=time.time())
+
+def test_devices_with_unstored_heartbeats_are_kept():
+    tracker = full_tracker(offline=2, online=0)
+    tracker._dirty.add(1)
+    tracker.track([100], user_id=2, now=time.time())
+    assert tracker.last_seen(1, 1) is not None
+    assert tracker.last_seen(2, 1) is None
+
+def test_rescan_waits_for_the_interval():
+    tracker = full_tracker(offline=0, online=2)
+    with pytest.raises(PresenceFull):
+        tracker.track([100], user_id=2, now=time.time())
+
+    # Went offline since the scan, but the next one is not due yet
+    for slot in range(2):
+        tracker._seen[slot] = time.time() - 1000
+    with pytest.raises(PresenceFull):
+        tracker.track([100], user_id=2, now=time.time())
+
+    tracker._last_evict -= tracker.flush_interval
+    tracker.track([100], user_id=2, now=time.time())
+    assert tracker.last_seen(100, 2) is not None
@@ -0,0 +1,52 @@
+import pytest
+
+from app.core.rate_limit import MemoryRateLimitBackend, RateLimiter, Rule, parse_rule, take_token
+
+RULE = Rule("test", limit=3, window=30)  # one token every 10 s
+
+def test_parse_rule():
+    assert parse_rule("login", "20/60") == Rule("login", 20, 60.0)
+    assert parse_rule("login", "20/60").rate == pytest.approx(1 / 3)
+
+def test_new_bucket_starts_full():
+    bucket, retry_after = take_token(None, RULE, now=100.0)
+    assert bucket == (2.0, 100.0)
+    assert retry_after == 0
+
+def test_empty_bucket_reports_time_to_next_token():
+    bucket = (0.0, 100.0)
+    bucket, retry_after = take_token(bucket, RULE, now=104.0)
+    assert bucket == (pytest.approx(0.4), 104.0)
+    assert retry_after == pytest.approx(6.0)
+
+def test_refill_is_capped_at_the_limit():
+    bucket, retry_after = take_token((0.0, 100.0), RULE, now=10_000.0)
+    assert bucket == (2.0, 10_000.0)
+    assert retry_after == 0
+
+def test_burst_then_steady_rate():
+    bucket, now = None, 0.0
+    allowed = []
+    for _ in range(5):
+        bucket, retry_after = take_token(bucket, RULE, now)
+        allowed.append(retry_after == 0)
+    assert allowed == [True, True, True, False, False]
+    bucket, retry_after = take_token(bucket, RULE, now + 10)
+    assert retry_after == 0
+
+@pytest.mark.anyio
+async def test_memory_backend_evicts_least_recent_keys():
+    limiter = RateLimiter(MemoryRateLimitBackend(max_keys=2))
+    for key in ("a", "b", "a", "c"):
+        await limiter.hit(RULE, key)
+    assert len(limiter.backend) == 2
+    assert set(limiter.backend._buckets) == {"test:a", "test:c"}
+
+@pytest.mark.anyio
+async def test_peek_does_not_take_a_token():
+    limiter = RateLimiter(MemoryRateLimitBackend(max_keys=10))
+    for _ in range(5):
+        assert await limiter.peek(RULE, "a") == 0
+    for _ in range(3):
+        assert await limiter.hit(RULE, "a") == 0
+    assert await limiter.peek(RULE, "a") > 0
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.core.database import session_scope
+from app.core.usage_ingest import IngestBufferFull, UsageIngestBuffer
+from app.models.usage import UsageRecord, UsageRollupDay
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2026, 10, 1, 12)
+
+def make_rows(count: int) -> list:
+    return [
+        {"user_id": 1, "device_id": 1, "metric": "kwh", "value": 1.0, "recorded_at": START + timedelta(seconds=i)}
+        for i in range(count)
+    ]
+
+async def stored() -> tuple:
+    """Raw rows and the records counted by the day rollup"""
+    async with session_scope() as db:
+        raw = (await db.execute(select(func.count()).select_from(UsageRecord))).scalar_one()
+        rolled = (await db.execute(select(func.coalesce(func.sum(UsageRollupDay.count), 0)))).scalar_one()
+    return raw, rolled
+
+async def test_flush_writes_rows_and_rollups(db_engine):
+    buffer = UsageIngestBuffer(max_records=100, flush_size=4, flush_interval=1)
+    buffer.add(make_rows(10))
+    assert await buffer.flush() == 10
+    assert len(buffer) == 0
+    assert await stored() == (10, 10)
+
+async def test_rejected_rows_are_dropped_alone(db_engine):
+    rows = make_rows(10)
+    # NOT NULL violations, in different halves of the batch
+    rows[2] = {**rows[2], "user_id": 2, "value": None}
+    rows[7] = {**rows[7], "user_id": 3, "value": None}
+    buffer = UsageIngestBuffer(max_records=100, flush_size=4, flush_interval=1)
+    buffer.add(rows)
+
+    assert await buffer.flush() == 8
+    assert buffer.dropped == 2
+    assert buffer.flush_failures == 0
+    assert len(buffer) == 0
+    assert await stored() == (8, 8)
+
+async def test_transient_failure_keeps_rows_in_order(db_engine, monkeypatch):
+    buffer = UsageIngestBuffer(max_records=100, flush_size=4, flush_interval=1)
+    buffer.add(make_rows(5))
+    write = buffer._write
+
+    async def lose_connection(rows):
+        # Rows added while the flush runs go behind the ones being written
+        buffer.add(make_rows(7)[5:])
+        raise ConnectionError("connection lost")
+
+    monkeypatch.setattr(buffer, "_write", lose_connection)
+    with pytest.raises(ConnectionError):
+        await buffer.flush()
+    assert buffer.flush_failures == 1
+    assert [row["recorded_at"] for row in buffer._rows] == [row["recorded_at"] for row in make_rows(7)]
+
+    monkeypatch.setattr(buffer, "_write", write)
+    assert await buffer.flush() == 7
+    assert await stored() == (7, 7)
+
+def test_add_rejects_beyond_capacity():
+    buffer = UsageIngestBuffer(max_records=5, flush_size=4, flush_interval=1)
+    buffer.add(make_rows(4))
+    with pytest.raises(IngestBufferFull):
+        buffer.add(make_rows(2))
+    assert (len(buffer), buffer.accepted, buffer.rejected) == (4, 4, 2)
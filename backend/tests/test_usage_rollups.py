@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from app.core.usage_rollups import aggregate, plan_ranges
+
+def test_plan_ranges_aligned_day():
+    start, end = datetime(2026, 10, 1), datetime(2026, 10, 3)
+    assert plan_ranges(start, end) == [("day", start, end)]
+
+def test_plan_ranges_coarsest_first_with_raw_edges():
+    start = datetime(2026, 10, 1, 22, 30, 15)
+    end = datetime(2026, 10, 3, 1, 45, 30)
+    assert plan_ranges(start, end) == [
+        ("raw", start, datetime(2026, 10, 1, 22, 31)),
+        ("minute", datetime(2026, 10, 1, 22, 31), datetime(2026, 10, 1, 23)),
+        ("hour", datetime(2026, 10, 1, 23), datetime(2026, 10, 2)),
+        ("day", datetime(2026, 10, 2), datetime(2026, 10, 3)),
+        ("hour", datetime(2026, 10, 3), datetime(2026, 10, 3, 1)),
+        ("minute", datetime(2026, 10, 3, 1), datetime(2026, 10, 3, 1, 45)),
+        ("raw", datetime(2026, 10, 3, 1, 45), end),
+    ]
+
+def test_plan_ranges_within_one_minute_reads_raw():
+    start, end = datetime(2026, 10, 1, 12, 0, 5), datetime(2026, 10, 1, 12, 0, 50)
+    assert plan_ranges(start, end) == [("raw", start, end)]
+
+def test_plan_ranges_pieces_cover_the_range():
+    start = datetime(2026, 9, 30, 23, 59, 59, 500000)
+    end = datetime(2026, 10, 2, 0, 0, 0, 250000)
+    ranges = plan_ranges(start, end)
+    assert ranges[0][1] == start and ranges[-1][2] == end
+    assert all(a[2] == b[1] for a, b in zip(ranges, ranges[1:]))
+
+def test_plan_ranges_empty():
+    moment = datetime(2026, 10, 1)
+    assert plan_ranges(moment, moment) == []
+
+def test_aggregate_folds_rows_into_every_level():
+    rows = [
+        {"user_id": 1, "device_id": 7, "metric": "kwh", "value": 2.0, "recorded_at": datetime(2026, 10, 1, 10, 0, 5)},
+        {"user_id": 1, "device_id": 7, "metric": "kwh", "value": 5.0, "recorded_at": datetime(2026, 10, 1, 10, 0, 40)},
+        {"user_id": 1, "device_id": 7, "metric": "kwh", "value": 1.0, "recorded_at": datetime(2026, 10, 1, 10, 30)},
+    ]
+    rollups = aggregate(rows)
+    assert len(rollups["minute"]) == 2
+    (hour,) = rollups["hour"]
+    assert (hour["count"], hour["total"], hour["min_value"], hour["max_value"]) == (3, 8.0, 1.0, 5.0)
+    assert rollups["day"][0]["bucket_start"] == datetime(2026, 10, 1)
@@ -1,17 +1,5 @@
 -- Create database if it doesn't exist
 CREATE DATABASE IF NOT EXISTS msatdb CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 
--- Use the database
-USE msatdb;
-
--- Create users table
-CREATE TABLE IF NOT EXISTS users (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    username VARCHAR(50) NOT NULL UNIQUE,
-    email VARCHAR(100) NOT NULL UNIQUE,
-    hashed_password VARCHAR(200) NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_username (username),
-    INDEX idx_email (email)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci; 
\ No newline at end of file
+-- Tables are created and changed only by the backend's migrations
+-- (python -m app.cli migrate), so the schema is defined in one place